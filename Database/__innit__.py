@@ -1,3 +1,12 @@
-from .database import Database, hash_password, verify_password, new_uuid, utc_now_iso
+from .database import (
+    UUID_SQL,
+    Database,
+    HashPolicy,
+    hash_password,
+    needs_rehash,
+    verify_password,
+    new_uuid,
+    utc_now_iso,
+)
 
-__all__ = ["Database", "hash_password", "verify_password", "new_uuid", "utc_now_iso"]
+__all__ = ["UUID_SQL", "Database", "HashPolicy", "hash_password", "needs_rehash", "verify_password", "new_uuid", "utc_now_iso"]
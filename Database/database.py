@@ -3,275 +3,425 @@ from __future__ import annotations
 import hashlib
 import hmac
 import os
+import pathlib
+import random
 import sqlite3
+import threading
+import time
 import uuid
+from collections import namedtuple
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Iterable, Optional
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
 
 
 def new_uuid() -> str:
     return str(uuid.uuid4())
 
 
+# SQL twin of new_uuid() for set-based INSERT ... SELECT: a fresh UUID4 string per row
+UUID_SQL = (
+    "lower(hex(randomblob(4))) || '-' || lower(hex(randomblob(2))) || '-4' || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || substr('89ab', 1 + abs(random() % 4), 1) || "
+    "substr(lower(hex(randomblob(2))), 2) || '-' || lower(hex(randomblob(6)))"
+)
+
+
 def utc_now_iso() -> str:
     return datetime.utcnow().replace(microsecond=0).isoformat(sep=" ")
 
 
+@dataclass(frozen=True)
+class HashPolicy:
+    """Algorithm and cost for new password hashes.
+
+    Encoded hashes are ``algo$params$salt$hash``: pbkdf2_sha256 stores the iteration count,
+    scrypt stores ``n:r:p``.
+    """
+
+    algo: str = "pbkdf2_sha256"
+    iterations: int = 210_000
+    n: int = 2**14
+    r: int = 8
+    p: int = 1
+
+    def params(self) -> str:
+        if self.algo == "scrypt":
+            return f"{self.n}:{self.r}:{self.p}"
+        return str(self.iterations)
+
+
+_hash_policy = HashPolicy()
+
+
+def current_hash_policy() -> HashPolicy:
+    return _hash_policy
+
+
+def set_hash_policy(policy: HashPolicy) -> None:
+    global _hash_policy
+    _hash_policy = policy
+
+
 @dataclass(frozen=True)
 class PasswordHash:
     algo: str
-    iterations: int
+    params: str
     salt_hex: str
     hash_hex: str
 
     def encode(self) -> str:
-        return f"{self.algo}${self.iterations}${self.salt_hex}${self.hash_hex}"
-
-
-def hash_password(password: str, *, iterations: int = 210_000, salt: bytes | None = None) -> str:
-    
+        return f"{self.algo}${self.params}${self.salt_hex}${self.hash_hex}"
+
+    @classmethod
+    def decode(cls, encoded: str) -> "PasswordHash":
+        algo, params, salt_hex, hash_hex = encoded.split("$", 3)
+        return cls(algo, params, salt_hex, hash_hex)
+
+    def policy(self) -> HashPolicy:
+        if self.algo == "scrypt":
+            n, r, p = (int(x) for x in self.params.split(":"))
+            return HashPolicy("scrypt", n=n, r=r, p=p)
+        if self.algo == "pbkdf2_sha256":
+            return HashPolicy("pbkdf2_sha256", iterations=int(self.params))
+        raise ValueError(f"Unsupported password hash algorithm: {self.algo}")
+
+
+def _derive(password: str, salt: bytes, policy: HashPolicy) -> bytes:
+    if policy.algo == "scrypt":
+        return hashlib.scrypt(
+            password.encode("utf-8"),
+            salt=salt,
+            n=policy.n,
+            r=policy.r,
+            p=policy.p,
+            maxmem=256 * policy.n * policy.r * policy.p + (1 << 20),
+            dklen=32,
+        )
+    if policy.algo == "pbkdf2_sha256":
+        return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, policy.iterations)
+    raise ValueError(f"Unsupported password hash algorithm: {policy.algo}")
+
+
+def hash_password(
+    password: str,
+    *,
+    iterations: int | None = None,
+    salt: bytes | None = None,
+    policy: HashPolicy | None = None,
+) -> str:
+    """Hash with the given policy (default: the process-wide current policy).
+
+    Passing iterations keeps the old behaviour of a pbkdf2_sha256 hash with that count.
+    """
+    if policy is None:
+        policy = HashPolicy(iterations=iterations) if iterations is not None else _hash_policy
     if salt is None:
         salt = os.urandom(16)
-    dk = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
-    ph = PasswordHash("pbkdf2_sha256", iterations, salt.hex(), dk.hex())
+    ph = PasswordHash(policy.algo, policy.params(), salt.hex(), _derive(password, salt, policy).hex())
     return ph.encode()
 
 
 def verify_password(password: str, encoded: str) -> bool:
     try:
-        algo, iters_s, salt_hex, hash_hex = encoded.split("$", 3)
-        if algo != "pbkdf2_sha256":
-            return False
-        iterations = int(iters_s)
-        salt = bytes.fromhex(salt_hex)
-        expected = bytes.fromhex(hash_hex)
-        candidate = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+        ph = PasswordHash.decode(encoded)
+        salt = bytes.fromhex(ph.salt_hex)
+        expected = bytes.fromhex(ph.hash_hex)
+        candidate = _derive(password, salt, ph.policy())
         return hmac.compare_digest(candidate, expected)
     except Exception:
         return False
 
 
-class Database:
-
-    def __init__(self, db_path: str = "sas.db") -> None:
-        self.db_path = db_path
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
-        self.conn.execute("PRAGMA foreign_keys = ON;")
-
-    def close(self) -> None:
-        self.conn.close()
-
-    def execute(self, sql: str, params: Iterable[Any] = ()) -> sqlite3.Cursor:
-        cur = self.conn.execute(sql, tuple(params))
-        self.conn.commit()
-        return cur
-
-    def executemany(self, sql: str, seq_of_params: Iterable[Iterable[Any]]) -> sqlite3.Cursor:
-        cur = self.conn.executemany(sql, [tuple(p) for p in seq_of_params])
-        self.conn.commit()
-        return cur
+def needs_rehash(encoded: str, policy: HashPolicy | None = None) -> bool:
+    """True when the stored hash uses another algorithm or a lower cost than the policy."""
+    policy = policy or _hash_policy
+    try:
+        stored = PasswordHash.decode(encoded).policy()
+    except Exception:
+        return True
+    if stored.algo != policy.algo:
+        return True
+    if policy.algo == "scrypt":
+        return stored.n < policy.n or stored.r < policy.r or stored.p < policy.p
+    return stored.iterations < policy.iterations
 
-    def query_one(self, sql: str, params: Iterable[Any] = ()) -> Optional[sqlite3.Row]:
-        cur = self.conn.execute(sql, tuple(params))
-        return cur.fetchone()
 
-    def query_all(self, sql: str, params: Iterable[Any] = ()) -> list[sqlite3.Row]:
-        cur = self.conn.execute(sql, tuple(params))
-        return cur.fetchall()
+def _namedtuple_factory() -> Callable[[sqlite3.Cursor, tuple], Any]:
+    cls: Any = None
 
-    def initialize(self) -> None:
+    def factory(cursor: sqlite3.Cursor, row: tuple) -> Any:
+        nonlocal cls
+        if cls is None:
+            cls = namedtuple("Row", [d[0] for d in cursor.description], rename=True)
+        return cls(*row)
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS User (
-                UserID TEXT PRIMARY KEY,
-                fullname TEXT NOT NULL,
-                email TEXT,
-                password TEXT NOT NULL,
-                phoneNumber TEXT,
-                address TEXT,
-                username TEXT UNIQUE NOT NULL,
-                birthDate TEXT
-            );
-            """
-        )
+    return factory
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Student (
-                UserID TEXT PRIMARY KEY,
-                StudentID TEXT UNIQUE NOT NULL,
-                majorName TEXT,
-                FOREIGN KEY (UserID) REFERENCES User(UserID) ON DELETE CASCADE
-            );
-            """
-        )
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Lecturer (
-                UserID TEXT PRIMARY KEY,
-                LecturerID TEXT UNIQUE NOT NULL,
-                FOREIGN KEY (UserID) REFERENCES User(UserID) ON DELETE CASCADE
-            );
-            """
-        )
+@dataclass
+class PoolStats:
+    connections_opened: int = 0
+    connections_closed: int = 0
+    statements: int = 0
+    busy_retries: int = 0
+    busy_failures: int = 0
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Administrator (
-                UserID TEXT PRIMARY KEY,
-                AdminID TEXT UNIQUE NOT NULL,
-                FOREIGN KEY (UserID) REFERENCES User(UserID) ON DELETE CASCADE
-            );
-            """
-        )
+    @property
+    def connections_open(self) -> int:
+        return self.connections_opened - self.connections_closed
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS System (
-                SystemName TEXT PRIMARY KEY
-            );
-            """
-        )
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS Warning (
-                WarningID TEXT PRIMARY KEY,
-                StudentUserID TEXT NOT NULL,
-                systemName TEXT NOT NULL,
-                className TEXT,
-                message TEXT NOT NULL,
-                createdAt TEXT NOT NULL,
-                FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE,
-                FOREIGN KEY (systemName) REFERENCES System(SystemName) ON DELETE RESTRICT
-            );
-            """
-        )
+def _is_busy_error(exc: sqlite3.OperationalError) -> bool:
+    msg = str(exc).lower()
+    return "locked" in msg or "busy" in msg
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS AttendanceSession (
-                SessionID TEXT PRIMARY KEY,
-                LecturerUserID TEXT NOT NULL,
-                date TEXT NOT NULL,
-                startTime TEXT,
-                durationMinutes INTEGER,
-                requirePIN INTEGER,
-                pin TEXT,
-                className TEXT NOT NULL,
-                status TEXT NOT NULL,
-                createdAt TEXT NOT NULL,
-                FOREIGN KEY (LecturerUserID) REFERENCES Lecturer(UserID) ON DELETE CASCADE
-            );
-            """
-        )
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS AttendanceRecord (
-                RecordID TEXT PRIMARY KEY,
-                SessionID TEXT NOT NULL,
-                StudentUserID TEXT NOT NULL,
-                status TEXT NOT NULL,
-                checkTime TEXT,
-                note TEXT,
-                updatedAt TEXT NOT NULL,
-                FOREIGN KEY (SessionID) REFERENCES AttendanceSession(SessionID) ON DELETE CASCADE,
-                FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE,
-                UNIQUE (SessionID, StudentUserID)
-            );
-            """
-        )
+class Database:
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS LeaveRequest (
-                RequestID TEXT PRIMARY KEY,
-                StudentUserID TEXT NOT NULL,
-                LecturerUserID TEXT NOT NULL,
-                SessionID TEXT,
-                type TEXT,
-                status TEXT NOT NULL,
-                reason TEXT NOT NULL,
-                evidencePath TEXT,
-                note TEXT,
-                createdAt TEXT NOT NULL,
-                FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE,
-                FOREIGN KEY (LecturerUserID) REFERENCES Lecturer(UserID) ON DELETE CASCADE
-            );
-            """
+    def __init__(
+        self,
+        db_path: str = "sas.db",
+        *,
+        autocommit: bool = True,
+        busy_timeout_ms: int = 2000,
+        max_retries: int = 6,
+        retry_backoff: float = 0.02,
+        read_only: bool = False,
+    ) -> None:
+        self.db_path = db_path
+        # read_only: mode=ro connections for reporting workers; no WAL switch, no migrations
+        self.read_only = read_only
+        # autocommit=False: writes stay pending until commit()/rollback() (deferred-commit mode)
+        self.autocommit = autocommit
+        self.busy_timeout_ms = busy_timeout_ms
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = PoolStats()
+
+        # one connection per thread; WAL lets readers run while a writer holds the lock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # connection -> owning thread, so connections of finished threads can be closed
+        self._conns: dict[sqlite3.Connection, threading.Thread] = {}
+        self._wal_checked = False
+        self._schema_current = False
+        self.conn  # open eagerly so a bad path fails here, as before
+
+    def _connect(self) -> sqlite3.Connection:
+        # isolation_level=None: no implicit deferred BEGIN, so a BUSY statement can simply be retried
+        # instead of being stuck on a stale WAL snapshot; transactions are opened explicitly below
+        target, uri = self.db_path, False
+        if self.read_only:
+            target, uri = f"{pathlib.Path(self.db_path).resolve().as_uri()}?mode=ro", True
+        conn = sqlite3.connect(
+            target,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            isolation_level=None,
+            uri=uri,
         )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON;")
+        with self._lock:
+            if not self._wal_checked and not self.read_only:
+                self._wal_checked = True
+                self._retry(lambda: conn.execute("PRAGMA journal_mode = WAL;"))
+            self._prune_dead_threads()
+            self._conns[conn] = threading.current_thread()
+            self.stats.connections_opened += 1
+        return conn
+
+    def _prune_dead_threads(self) -> None:
+        # caller holds self._lock
+        dead = [c for c, t in self._conns.items() if not t.is_alive()]
+        for conn in dead:
+            del self._conns[conn]
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            self.stats.connections_closed += 1
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @property
+    def _tx_depth(self) -> int:
+        return getattr(self._local, "depth", 0)
+
+    @_tx_depth.setter
+    def _tx_depth(self, value: int) -> None:
+        self._local.depth = value
 
-        self.execute(
-            """
-            CREATE TABLE IF NOT EXISTS AttendanceReport (
-                ReportID TEXT PRIMARY KEY,
-                ManagedByAdminUserID TEXT,
-                SummarizedByLecturerUserID TEXT,
-                fileName TEXT,
-                createdAt TEXT NOT NULL,
-                title TEXT,
-                FOREIGN KEY (ManagedByAdminUserID) REFERENCES Administrator(UserID) ON DELETE SET NULL,
-                FOREIGN KEY (SummarizedByLecturerUserID) REFERENCES Lecturer(UserID) ON DELETE SET NULL
-            );
-            """
-        )
+    def close(self) -> None:
+        with self._lock:
+            conns, self._conns = list(self._conns), {}
+            for conn in conns:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+                self.stats.connections_closed += 1
+        self._local = threading.local()
+
+    def close_thread_connection(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        with self._lock:
+            if self._conns.pop(conn, None) is not None:
+                self.stats.connections_closed += 1
+        conn.close()
+        self._local.conn = None
+
+    def pool_stats(self) -> dict[str, int]:
+        with self._lock:
+            self._prune_dead_threads()
+            return {
+                "connections_open": self.stats.connections_open,
+                "connections_opened": self.stats.connections_opened,
+                "statements": self.stats.statements,
+                "busy_retries": self.stats.busy_retries,
+                "busy_failures": self.stats.busy_failures,
+            }
+
+    def _retry(self, fn: Callable[[], T]) -> T:
+        """Run fn, retrying with bounded exponential backoff while SQLite reports BUSY/LOCKED."""
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except sqlite3.OperationalError as e:
+                if not _is_busy_error(e):
+                    raise
+                if attempt >= self.max_retries:
+                    with self._stats_lock:
+                        self.stats.busy_failures += 1
+                    raise
+                with self._stats_lock:
+                    self.stats.busy_retries += 1
+                delay = min(self.retry_backoff * (2 ** attempt), 1.0)
+                time.sleep(delay * (0.5 + random.random() / 2))
+                attempt += 1
+
+    def _run(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        conn = self.conn
+        with self._stats_lock:
+            self.stats.statements += 1
+        return self._retry(lambda: fn(conn))
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._tx_depth > 0
+
+    def commit(self) -> None:
+        if self._tx_depth == 0:
+            self._retry(self.conn.commit)
+
+    def rollback(self) -> None:
+        if self._tx_depth == 0:
+            self.conn.rollback()
+
+    def _maybe_commit(self) -> None:
+        if self.autocommit and self._tx_depth == 0:
+            self._retry(self.conn.commit)
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        """Unit of work: one COMMIT for everything inside; nested blocks become savepoints."""
+        conn = self.conn
+        depth = self._tx_depth
+        # pending deferred-mode writes are kept out of this block's rollback via a savepoint
+        outermost = depth == 0 and not conn.in_transaction
+        savepoint = f"sp_{depth}"
+        # IMMEDIATE takes the write lock up front, so a busy writer is retried here instead of deadlocking later
+        self._retry(lambda: conn.execute("BEGIN IMMEDIATE" if outermost else f"SAVEPOINT {savepoint}"))
+        self._tx_depth = depth + 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth = depth
+            if outermost:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+            raise
+        self._tx_depth = depth
+        if not outermost:
+            conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+        self._maybe_commit()
 
-    def ensure_schema_extras(self) -> None:
+    def execute(self, sql: str, params: Iterable[Any] = ()) -> sqlite3.Cursor:
+        conn = self.conn
+        if not self.autocommit and not conn.in_transaction:
+            self._retry(lambda: conn.execute("BEGIN IMMEDIATE"))
+        return self._run(lambda c: c.execute(sql, tuple(params)))
 
-        def has_column(table: str, col: str) -> bool:
-            rows = self.query_all(f"PRAGMA table_info({table});")
-            return any(r["name"] == col for r in rows)
+    def executemany(self, sql: str, seq_of_params: Iterable[Iterable[Any]]) -> sqlite3.Cursor:
+        seq = [tuple(p) for p in seq_of_params]
+        with self.transaction():
+            cur = self._run(lambda c: c.executemany(sql, seq))
+        return cur
 
+    def query_one(self, sql: str, params: Iterable[Any] = ()) -> Optional[sqlite3.Row]:
+        return self._run(lambda c: c.execute(sql, tuple(params)).fetchone())
 
+    def query_all(self, sql: str, params: Iterable[Any] = ()) -> list[sqlite3.Row]:
+        return self._run(lambda c: c.execute(sql, tuple(params)).fetchall())
+
+    def query_iter(
+        self,
+        sql: str,
+        params: Iterable[Any] = (),
+        *,
+        chunk_size: int = 500,
+        row_factory: Optional[str | Callable[[sqlite3.Cursor, tuple], Any]] = None,
+    ) -> Iterator[Any]:
+        """Yield rows lazily, fetching chunk_size at a time, instead of materializing them.
+
+        row_factory: None keeps sqlite3.Row, "tuple" gives plain tuples, "namedtuple" gives
+        namedtuples named after the result columns, or pass any sqlite3 row factory.
+        """
+        cur = self.conn.cursor()
+        if row_factory == "tuple":
+            cur.row_factory = None
+        elif row_factory == "namedtuple":
+            cur.row_factory = _namedtuple_factory()
+        elif callable(row_factory):
+            cur.row_factory = row_factory
+        self._run(lambda c: cur.execute(sql, tuple(params)))
         try:
-            if not has_column("AttendanceSession", "startTime"):
-                self.execute("ALTER TABLE AttendanceSession ADD COLUMN startTime TEXT;")
-            if not has_column("AttendanceSession", "durationMinutes"):
-                self.execute("ALTER TABLE AttendanceSession ADD COLUMN durationMinutes INTEGER;")
-            if not has_column("AttendanceSession", "requirePIN"):
-                self.execute("ALTER TABLE AttendanceSession ADD COLUMN requirePIN INTEGER;")
-            if not has_column("AttendanceSession", "pin"):
-                self.execute("ALTER TABLE AttendanceSession ADD COLUMN pin TEXT;")
-        except Exception:
-       
-            pass
-
-  
-        try:
-            if not has_column("LeaveRequest", "SessionID"):
-                self.execute("ALTER TABLE LeaveRequest ADD COLUMN SessionID TEXT;")
-            if not has_column("LeaveRequest", "type"):
-                self.execute("ALTER TABLE LeaveRequest ADD COLUMN type TEXT;")
-            if not has_column("LeaveRequest", "evidencePath"):
-                self.execute("ALTER TABLE LeaveRequest ADD COLUMN evidencePath TEXT;")
-        except Exception:
-            pass
-
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cur.close()
+
+    def schema_version(self) -> int:
+        row = self.query_one("PRAGMA user_version;")
+        return int(row[0]) if row else 0
 
-        try:
-            if not has_column("Warning", "className"):
-                self.execute("ALTER TABLE Warning ADD COLUMN className TEXT;")
-        except Exception:
-            pass
+    def initialize(self) -> None:
+        if self.read_only:
+            return
+        from .migrations import migrate
 
+        migrate(self)
 
-        try:
-            self.execute("CREATE INDEX IF NOT EXISTS idx_record_session ON AttendanceRecord(SessionID);")
-            self.execute("CREATE INDEX IF NOT EXISTS idx_record_student ON AttendanceRecord(StudentUserID);")
-            self.execute("CREATE INDEX IF NOT EXISTS idx_session_class ON AttendanceSession(className, date);")
-            self.execute("CREATE INDEX IF NOT EXISTS idx_leave_lecturer ON LeaveRequest(LecturerUserID, status);")
-            self.execute("CREATE INDEX IF NOT EXISTS idx_warning_student ON Warning(StudentUserID, createdAt);")
-        except Exception:
-            pass
-        try:
-            if not has_column("User", "failedAttempts"):
-                self.execute("ALTER TABLE User ADD COLUMN failedAttempts INTEGER DEFAULT 0;")
-            if not has_column("User", "lockUntil"):
-                self.execute("ALTER TABLE User ADD COLUMN lockUntil TEXT;")
-        except Exception:
-            pass
+    def ensure_schema_extras(self) -> None:
+        # kept for older callers; a current schema costs one PRAGMA read (zero once migrated here)
+        self.initialize()
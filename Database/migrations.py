@@ -0,0 +1,500 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from .database import Database
+
+
+def _has_column(db: "Database", table: str, col: str) -> bool:
+    rows = db.query_all(f"PRAGMA table_info({table});")
+    return any(r["name"] == col for r in rows)
+
+
+def _add_column(db: "Database", table: str, col: str, decl: str) -> None:
+    if not _has_column(db, table, col):
+        db.execute(f"ALTER TABLE {table} ADD COLUMN {col} {decl};")
+
+
+def seed_sequence(db: "Database", prefix: str, table: str, column: str) -> None:
+    """Create the Sequence row for prefix at the highest numeric ID already in table.column."""
+    # numeric max after the prefix (text order put S1000 below S999); any prefix length
+    db.execute(
+        f"""
+        INSERT INTO Sequence (name, value)
+        SELECT ?, COALESCE(MAX(CAST(substr({column}, ?) AS INTEGER)), 0)
+        FROM {table}
+        WHERE {column} GLOB ?
+        ON CONFLICT(name) DO NOTHING
+        """,
+        (f"{table}.{column}:{prefix}", len(prefix) + 1, f"{prefix}[0-9]*"),
+    )
+
+
+def _m001_base_schema(db: "Database") -> None:
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS User (
+            UserID TEXT PRIMARY KEY,
+            fullname TEXT NOT NULL,
+            email TEXT,
+            password TEXT NOT NULL,
+            phoneNumber TEXT,
+            address TEXT,
+            username TEXT UNIQUE NOT NULL,
+            birthDate TEXT
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Student (
+            UserID TEXT PRIMARY KEY,
+            StudentID TEXT UNIQUE NOT NULL,
+            majorName TEXT,
+            FOREIGN KEY (UserID) REFERENCES User(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Lecturer (
+            UserID TEXT PRIMARY KEY,
+            LecturerID TEXT UNIQUE NOT NULL,
+            FOREIGN KEY (UserID) REFERENCES User(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Administrator (
+            UserID TEXT PRIMARY KEY,
+            AdminID TEXT UNIQUE NOT NULL,
+            FOREIGN KEY (UserID) REFERENCES User(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS System (
+            SystemName TEXT PRIMARY KEY
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Warning (
+            WarningID TEXT PRIMARY KEY,
+            StudentUserID TEXT NOT NULL,
+            systemName TEXT NOT NULL,
+            className TEXT,
+            message TEXT NOT NULL,
+            createdAt TEXT NOT NULL,
+            FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE,
+            FOREIGN KEY (systemName) REFERENCES System(SystemName) ON DELETE RESTRICT
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AttendanceSession (
+            SessionID TEXT PRIMARY KEY,
+            LecturerUserID TEXT NOT NULL,
+            date TEXT NOT NULL,
+            startTime TEXT,
+            durationMinutes INTEGER,
+            requirePIN INTEGER,
+            pin TEXT,
+            className TEXT NOT NULL,
+            status TEXT NOT NULL,
+            createdAt TEXT NOT NULL,
+            FOREIGN KEY (LecturerUserID) REFERENCES Lecturer(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AttendanceRecord (
+            RecordID TEXT PRIMARY KEY,
+            SessionID TEXT NOT NULL,
+            StudentUserID TEXT NOT NULL,
+            status TEXT NOT NULL,
+            checkTime TEXT,
+            note TEXT,
+            updatedAt TEXT NOT NULL,
+            FOREIGN KEY (SessionID) REFERENCES AttendanceSession(SessionID) ON DELETE CASCADE,
+            FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE,
+            UNIQUE (SessionID, StudentUserID)
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS LeaveRequest (
+            RequestID TEXT PRIMARY KEY,
+            StudentUserID TEXT NOT NULL,
+            LecturerUserID TEXT NOT NULL,
+            SessionID TEXT,
+            type TEXT,
+            status TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            evidencePath TEXT,
+            note TEXT,
+            createdAt TEXT NOT NULL,
+            FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE,
+            FOREIGN KEY (LecturerUserID) REFERENCES Lecturer(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AttendanceReport (
+            ReportID TEXT PRIMARY KEY,
+            ManagedByAdminUserID TEXT,
+            SummarizedByLecturerUserID TEXT,
+            fileName TEXT,
+            createdAt TEXT NOT NULL,
+            title TEXT,
+            FOREIGN KEY (ManagedByAdminUserID) REFERENCES Administrator(UserID) ON DELETE SET NULL,
+            FOREIGN KEY (SummarizedByLecturerUserID) REFERENCES Lecturer(UserID) ON DELETE SET NULL
+        );
+        """
+    )
+
+
+def _m002_schema_extras(db: "Database") -> None:
+    # databases created before these columns existed (all IF NOT EXISTS above) still lack them
+    _add_column(db, "AttendanceSession", "startTime", "TEXT")
+    _add_column(db, "AttendanceSession", "durationMinutes", "INTEGER")
+    _add_column(db, "AttendanceSession", "requirePIN", "INTEGER")
+    _add_column(db, "AttendanceSession", "pin", "TEXT")
+
+    _add_column(db, "LeaveRequest", "SessionID", "TEXT")
+    _add_column(db, "LeaveRequest", "type", "TEXT")
+    _add_column(db, "LeaveRequest", "evidencePath", "TEXT")
+
+    _add_column(db, "Warning", "className", "TEXT")
+
+    _add_column(db, "User", "failedAttempts", "INTEGER DEFAULT 0")
+    _add_column(db, "User", "lockUntil", "TEXT")
+
+    db.execute("CREATE INDEX IF NOT EXISTS idx_record_session ON AttendanceRecord(SessionID);")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_record_student ON AttendanceRecord(StudentUserID);")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_session_class ON AttendanceSession(className, date);")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_leave_lecturer ON LeaveRequest(LecturerUserID, status);")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_warning_student ON Warning(StudentUserID, createdAt);")
+
+
+def _m003_enrollment(db: "Database") -> None:
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Enrollment (
+            className TEXT NOT NULL,
+            StudentUserID TEXT NOT NULL,
+            enrolledAt TEXT NOT NULL,
+            PRIMARY KEY (className, StudentUserID),
+            FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_enrollment_student ON Enrollment(StudentUserID);")
+
+_COUNTER_ADD = """
+    INSERT INTO AttendanceCounter (className, StudentUserID, Present, Late, Absent, Excused, Total)
+    SELECT s.className, {rec}.StudentUserID,
+           {rec}.status='Present', {rec}.status='Late', {rec}.status='Absent', {rec}.status='Excused', 1
+    FROM AttendanceSession s
+    WHERE s.SessionID = {rec}.SessionID
+    ON CONFLICT(className, StudentUserID) DO UPDATE SET
+        Present = Present + excluded.Present,
+        Late = Late + excluded.Late,
+        Absent = Absent + excluded.Absent,
+        Excused = Excused + excluded.Excused,
+        Total = Total + 1;
+"""
+
+_COUNTER_SUB = """
+    UPDATE AttendanceCounter SET
+        Present = Present - ({rec}.status='Present'),
+        Late = Late - ({rec}.status='Late'),
+        Absent = Absent - ({rec}.status='Absent'),
+        Excused = Excused - ({rec}.status='Excused'),
+        Total = Total - 1
+    WHERE StudentUserID = {rec}.StudentUserID
+      AND className = (SELECT className FROM AttendanceSession WHERE SessionID = {rec}.SessionID);
+"""
+
+
+def _m004_attendance_counters(db: "Database") -> None:
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AttendanceCounter (
+            className TEXT NOT NULL,
+            StudentUserID TEXT NOT NULL,
+            Present INTEGER NOT NULL DEFAULT 0,
+            Late INTEGER NOT NULL DEFAULT 0,
+            Absent INTEGER NOT NULL DEFAULT 0,
+            Excused INTEGER NOT NULL DEFAULT 0,
+            Total INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (className, StudentUserID),
+            FOREIGN KEY (StudentUserID) REFERENCES Student(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+    db.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_counter_record_insert
+        AFTER INSERT ON AttendanceRecord
+        BEGIN
+            {_COUNTER_ADD.format(rec="NEW")}
+        END;
+        """
+    )
+    db.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_counter_record_delete
+        AFTER DELETE ON AttendanceRecord
+        BEGIN
+            {_COUNTER_SUB.format(rec="OLD")}
+        END;
+        """
+    )
+    db.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_counter_record_update
+        AFTER UPDATE OF status, SessionID, StudentUserID ON AttendanceRecord
+        WHEN OLD.status IS NOT NEW.status
+          OR OLD.SessionID IS NOT NEW.SessionID
+          OR OLD.StudentUserID IS NOT NEW.StudentUserID
+        BEGIN
+            {_COUNTER_SUB.format(rec="OLD")}
+            {_COUNTER_ADD.format(rec="NEW")}
+        END;
+        """
+    )
+    # a session's records move with it when its class changes, and leave with it when it is deleted
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_counter_session_class
+        AFTER UPDATE OF className ON AttendanceSession
+        WHEN OLD.className IS NOT NEW.className
+        BEGIN
+            UPDATE AttendanceCounter SET
+                Present = Present - (SELECT COUNT(*) FROM AttendanceRecord ar WHERE ar.SessionID = NEW.SessionID
+                                     AND ar.StudentUserID = AttendanceCounter.StudentUserID AND ar.status='Present'),
+                Late = Late - (SELECT COUNT(*) FROM AttendanceRecord ar WHERE ar.SessionID = NEW.SessionID
+                               AND ar.StudentUserID = AttendanceCounter.StudentUserID AND ar.status='Late'),
+                Absent = Absent - (SELECT COUNT(*) FROM AttendanceRecord ar WHERE ar.SessionID = NEW.SessionID
+                                   AND ar.StudentUserID = AttendanceCounter.StudentUserID AND ar.status='Absent'),
+                Excused = Excused - (SELECT COUNT(*) FROM AttendanceRecord ar WHERE ar.SessionID = NEW.SessionID
+                                     AND ar.StudentUserID = AttendanceCounter.StudentUserID AND ar.status='Excused'),
+                Total = Total - 1
+            WHERE className = OLD.className
+              AND StudentUserID IN (SELECT StudentUserID FROM AttendanceRecord WHERE SessionID = NEW.SessionID);
+
+            INSERT INTO AttendanceCounter (className, StudentUserID, Present, Late, Absent, Excused, Total)
+            SELECT NEW.className, ar.StudentUserID,
+                   ar.status='Present', ar.status='Late', ar.status='Absent', ar.status='Excused', 1
+            FROM AttendanceRecord ar
+            WHERE ar.SessionID = NEW.SessionID
+            ON CONFLICT(className, StudentUserID) DO UPDATE SET
+                Present = Present + excluded.Present,
+                Late = Late + excluded.Late,
+                Absent = Absent + excluded.Absent,
+                Excused = Excused + excluded.Excused,
+                Total = Total + 1;
+        END;
+        """
+    )
+    db.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_counter_session_delete
+        BEFORE DELETE ON AttendanceSession
+        BEGIN
+            DELETE FROM AttendanceRecord WHERE SessionID = OLD.SessionID;
+        END;
+        """
+    )
+    db.execute(
+        """
+        INSERT INTO AttendanceCounter (className, StudentUserID, Present, Late, Absent, Excused, Total)
+        SELECT s.className, ar.StudentUserID,
+               SUM(ar.status='Present'), SUM(ar.status='Late'),
+               SUM(ar.status='Absent'), SUM(ar.status='Excused'), COUNT(*)
+        FROM AttendanceRecord ar
+        JOIN AttendanceSession s ON s.SessionID = ar.SessionID
+        GROUP BY s.className, ar.StudentUserID
+        """
+    )
+
+
+def _m005_warning_rule(db: "Database") -> None:
+    _add_column(db, "Warning", "rule", "TEXT")
+    # older warnings only carry the threshold in their message; keep the earliest per student/class
+    db.execute(
+        """
+        UPDATE Warning
+        SET rule = 'absent>=' || substr(message, length('Absence threshold reached (') + 1,
+                                        length(message) - length('Absence threshold reached (') - 1)
+        WHERE rule IS NULL AND message LIKE 'Absence threshold reached (%)'
+        """
+    )
+    db.execute(
+        """
+        UPDATE Warning SET rule = NULL
+        WHERE rule IS NOT NULL AND EXISTS (
+            SELECT 1 FROM Warning w
+            WHERE w.StudentUserID = Warning.StudentUserID
+              AND w.className IS Warning.className
+              AND w.rule = Warning.rule
+              AND w.WarningID < Warning.WarningID
+        )
+        """
+    )
+    db.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_warning_rule
+        ON Warning(StudentUserID, className, rule) WHERE rule IS NOT NULL;
+        """
+    )
+
+
+def _m006_sequences(db: "Database") -> None:
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Sequence (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+        """
+    )
+    # continue numerically from existing IDs (same as IdGenerator's first-use seeding)
+    for prefix, table, column in (
+        ("S", "AttendanceSession", "SessionID"),
+        ("R", "LeaveRequest", "RequestID"),
+        ("W", "Warning", "WarningID"),
+    ):
+        seed_sequence(db, prefix, table, column)
+
+
+def _m007_settings(db: "Database") -> None:
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Setting (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            updatedAt TEXT NOT NULL DEFAULT (datetime('now'))
+        );
+        """
+    )
+
+
+def _m008_auth_tokens(db: "Database") -> None:
+    # only a SHA-256 of each token is stored
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AuthToken (
+            TokenHash TEXT PRIMARY KEY,
+            UserID TEXT NOT NULL,
+            createdAt TEXT NOT NULL,
+            expiresAt TEXT NOT NULL,
+            FOREIGN KEY (UserID) REFERENCES User(UserID) ON DELETE CASCADE
+        );
+        """
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_authtoken_user ON AuthToken(UserID);")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_authtoken_expires ON AuthToken(expiresAt);")
+
+
+def _m009_session_date_index(db: "Database") -> None:
+    # date-bounded searches seek here instead of scanning every session
+    db.execute("CREATE INDEX IF NOT EXISTS idx_session_date ON AttendanceSession(date);")
+
+
+def _m010_report_cache(db: "Database") -> None:
+    _add_column(db, "AttendanceReport", "className", "TEXT")
+    _add_column(db, "AttendanceReport", "dateFrom", "TEXT")
+    _add_column(db, "AttendanceReport", "dateTo", "TEXT")
+    _add_column(db, "AttendanceReport", "options", "TEXT")
+    _add_column(db, "AttendanceReport", "fingerprint", "TEXT")
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS idx_report_fingerprint ON AttendanceReport(className, fingerprint);"
+    )
+
+
+def _m011_warning_rule_index(db: "Database") -> None:
+    # m005 indexed the nullable className directly (NULLs never collide) and deduped by text
+    # WarningID order, where W999 sorts after W1000; rebuild with COALESCE and rowid order
+    db.execute("DROP INDEX IF EXISTS uq_warning_rule;")
+    db.execute(
+        """
+        UPDATE Warning SET rule = NULL
+        WHERE rule IS NOT NULL AND EXISTS (
+            SELECT 1 FROM Warning w
+            WHERE w.StudentUserID = Warning.StudentUserID
+              AND COALESCE(w.className, '') = COALESCE(Warning.className, '')
+              AND w.rule = Warning.rule
+              AND w.rowid < Warning.rowid
+        )
+        """
+    )
+    db.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_warning_rule
+        ON Warning(StudentUserID, COALESCE(className, ''), rule) WHERE rule IS NOT NULL;
+        """
+    )
+
+
+def _m012_report_file_stat(db: "Database") -> None:
+    _add_column(db, "AttendanceReport", "fileSize", "INTEGER")
+    _add_column(db, "AttendanceReport", "fileMtimeNs", "INTEGER")
+
+
+# Append only: a migration's number is stored in PRAGMA user_version once applied.
+MIGRATIONS: list[tuple[int, Callable[["Database"], None]]] = [
+    (1, _m001_base_schema),
+    (2, _m002_schema_extras),
+    (3, _m003_enrollment),
+    (4, _m004_attendance_counters),
+    (5, _m005_warning_rule),
+    (6, _m006_sequences),
+    (7, _m007_settings),
+    (8, _m008_auth_tokens),
+    (9, _m009_session_date_index),
+    (10, _m010_report_cache),
+    (11, _m011_warning_rule_index),
+    (12, _m012_report_file_stat),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(db: "Database") -> int:
+    """Apply pending migrations in one transaction; a current schema costs a single PRAGMA read."""
+    if getattr(db, "_schema_current", False):
+        return LATEST_VERSION
+    if db.schema_version() >= LATEST_VERSION:
+        db._schema_current = True
+        return LATEST_VERSION
+
+    with db.transaction():
+        # another process may have migrated while we waited for the write lock
+        version = db.schema_version()
+        for number, step in MIGRATIONS:
+            if number > version:
+                step(db)
+                version = number
+        db.execute(f"PRAGMA user_version = {version};")
+
+    db._schema_current = True
+    return version
@@ -1,26 +1,121 @@
 from __future__ import annotations
 
 import sys
+from typing import Optional
 
 from Database.database import Database
+from models.attendanceCounter import AttendanceCounter
+from services.batch_export import batch_export, lecturer_classes
+from services.checkin_writer import CheckInWriter
+from services.login_limiter import LoginLimiter
+from services.hash_policy import apply_saved_hash_policy, calibrate_hash_policy, save_hash_policy
+from services.token_service import TokenStore
+from services.warning_policy import WarningPolicy, load_warning_policy, save_warning_policy
 from ui.auth_router import AuthRouter
 from ui.seed import Seeder
 
 
+def _flag_value(flag: str, default: float) -> float:
+    i = sys.argv.index(flag)
+    try:
+        return float(sys.argv[i + 1])
+    except (IndexError, ValueError):
+        return default
+
+
+def _flag_str(flag: str) -> Optional[str]:
+    if flag not in sys.argv:
+        return None
+    i = sys.argv.index(flag)
+    return sys.argv[i + 1] if i + 1 < len(sys.argv) else None
+
+
+def _batch_export(db: Database) -> None:
+    # --batch-export (--classes A,B | --lecturer LecturerID) [--from D] [--to D] [--out DIR] [--single FILE]
+    classes = [c.strip() for c in (_flag_str("--classes") or "").split(",") if c.strip()]
+    lecturer_id = _flag_str("--lecturer")
+    if lecturer_id:
+        row = db.query_one("SELECT UserID FROM Lecturer WHERE LecturerID=?", (lecturer_id,))
+        if not row:
+            print(f"Lecturer not found: {lecturer_id}")
+            return
+        classes += lecturer_classes(db, row["UserID"])
+    if not classes:
+        print("No classes to export (use --classes A,B or --lecturer LecturerID).")
+        return
+
+    def progress(done: int, total: int, class_name: str, ok: bool) -> None:
+        print(f"[{done}/{total}] {class_name}: {'ok' if ok else 'FAILED'}")
+
+    result = batch_export(
+        db.db_path,
+        classes,
+        date_from=_flag_str("--from"),
+        date_to=_flag_str("--to"),
+        output_dir=_flag_str("--out") or "reports",
+        single_workbook=_flag_str("--single"),
+        progress=progress,
+    )
+    print(f"Exported {len(result.exported)}, failed {len(result.failed)} in {result.seconds:.1f}s.")
+    print(f"Manifest: {result.manifest_path}")
+
+
 def main() -> None:
     import os
     db_path = os.path.join(os.path.dirname(__file__), "sas.db")
     db = Database(db_path)
 
     db.initialize()
-    db.ensure_schema_extras()
+    apply_saved_hash_policy(db)
+    TokenStore.for_db(db).purge_expired()
+
+    if "--calibrate-hash" in sys.argv:
+        algo = "scrypt" if "--scrypt" in sys.argv else "pbkdf2_sha256"
+        policy = calibrate_hash_policy(target_ms=_flag_value("--calibrate-hash", 250.0), algo=algo)
+        save_hash_policy(db, policy)
+        print(f"Password hash policy saved: {policy.algo} {policy.params()}")
+        db.close()
+        return
+
+    if "--warning-policy" in sys.argv:
+        text = _flag_str("--warning-policy")
+        if text:
+            try:
+                save_warning_policy(db, WarningPolicy.from_json(text))
+            except (ValueError, TypeError) as e:
+                print(f"Invalid warning policy: {e}")
+                db.close()
+                return
+        for rule in load_warning_policy(db).rules:
+            print(f"{rule.rule}: {rule.message}")
+        db.close()
+        return
 
     if "--seed" in sys.argv:
         Seeder(db).run()
         db.close()
         return
 
-    AuthRouter(db).run()
+    if "--batch-export" in sys.argv:
+        _batch_export(db)
+        db.close()
+        return
+
+    if "--rebuild-counters" in sys.argv:
+        rows = AttendanceCounter.rebuild(db)
+        print(f"Attendance counters rebuilt ({rows} rows).")
+        db.close()
+        return
+
+    if "--write-behind" in sys.argv:
+        CheckInWriter.enable(db)
+
+    try:
+        AuthRouter(db).run()
+    finally:
+        LoginLimiter.for_db(db).flush()
+        CheckInWriter.disable(db)
+        db.close()
 
 
 if __name__ == "__main__":
@@ -13,16 +13,18 @@ class Administrator(User):
     admin_id: str = ""
 
     def save(self, db: Database) -> None:
-        super().save(db)
-        db.execute(
-            """
-            INSERT INTO Administrator (UserID, AdminID)
-            VALUES (?, ?)
-            ON CONFLICT(UserID) DO UPDATE SET
-                AdminID=excluded.AdminID
-            """,
-            (self.user_id, self.admin_id),
-        )
+        with db.transaction():
+            super().save(db)
+            db.execute(
+                """
+                INSERT INTO Administrator (UserID, AdminID)
+                VALUES (?, ?)
+                ON CONFLICT(UserID) DO UPDATE SET
+                    AdminID=excluded.AdminID
+                """,
+                (self.user_id, self.admin_id),
+            )
+        self._forget_principal(db)
 
     @classmethod
     def load_by_user_id(cls, db: Database, user_id: str) -> Optional["Administrator"]:
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from Database.database import Database
+
+
+@dataclass
+class AttendanceCounter:
+    """Per-student, per-class status totals, kept current by triggers on AttendanceRecord."""
+
+    class_name: str
+    student_user_id: str
+    present: int = 0
+    late: int = 0
+    absent: int = 0
+    excused: int = 0
+    total: int = 0
+
+    @classmethod
+    def load(cls, db: Database, *, class_name: str, student_user_id: str) -> Optional["AttendanceCounter"]:
+        row = db.query_one(
+            "SELECT * FROM AttendanceCounter WHERE className=? AND StudentUserID=?",
+            (class_name, student_user_id),
+        )
+        return cls.from_row(row) if row else None
+
+    @classmethod
+    def list_for_class(cls, db: Database, class_name: str) -> list["AttendanceCounter"]:
+        return list(cls.iter_for_class(db, class_name))
+
+    @classmethod
+    def iter_for_class(cls, db: Database, class_name: str) -> Iterator["AttendanceCounter"]:
+        rows = db.query_iter(
+            "SELECT * FROM AttendanceCounter WHERE className=? AND Total > 0",
+            (class_name,),
+        )
+        return (cls.from_row(r) for r in rows)
+
+    @classmethod
+    def rebuild(cls, db: Database, class_name: Optional[str] = None) -> int:
+        """Recompute counters from AttendanceRecord (all classes, or one). Returns rows written."""
+        where = "WHERE s.className=?" if class_name is not None else ""
+        params = (class_name,) if class_name is not None else ()
+        with db.transaction():
+            if class_name is not None:
+                db.execute("DELETE FROM AttendanceCounter WHERE className=?", params)
+            else:
+                db.execute("DELETE FROM AttendanceCounter")
+            cur = db.execute(
+                f"""
+                INSERT INTO AttendanceCounter (className, StudentUserID, Present, Late, Absent, Excused, Total)
+                SELECT s.className, ar.StudentUserID,
+                       SUM(ar.status='Present'), SUM(ar.status='Late'),
+                       SUM(ar.status='Absent'), SUM(ar.status='Excused'), COUNT(*)
+                FROM AttendanceRecord ar
+                JOIN AttendanceSession s ON s.SessionID = ar.SessionID
+                {where}
+                GROUP BY s.className, ar.StudentUserID
+                """,
+                params,
+            )
+        return max(cur.rowcount, 0)
+
+    @classmethod
+    def from_row(cls, row) -> "AttendanceCounter":
+        return cls(
+            class_name=row["className"],
+            student_user_id=row["StudentUserID"],
+            present=int(row["Present"]),
+            late=int(row["Late"]),
+            absent=int(row["Absent"]),
+            excused=int(row["Excused"]),
+            total=int(row["Total"]),
+        )
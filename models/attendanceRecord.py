@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from Database.database import Database, new_uuid, utc_now_iso
 
@@ -60,6 +60,69 @@ class AttendanceRecord:
             ),
         )
 
+    def insert_if_session_open(self, db: Database) -> bool:
+        """Insert as a new row only while the session is still OPEN. Raises IntegrityError on duplicates."""
+        cur = db.execute(
+            """
+            INSERT INTO AttendanceRecord (RecordID, SessionID, StudentUserID, status, checkTime, note, updatedAt)
+            SELECT ?, ?, ?, ?, ?, ?, ?
+            WHERE EXISTS (SELECT 1 FROM AttendanceSession WHERE SessionID=? AND status='OPEN')
+            """,
+            (
+                self.record_id,
+                self.session_id,
+                self.student_user_id,
+                self.status,
+                self.check_time,
+                self.note,
+                self.updated_at,
+                self.session_id,
+            ),
+        )
+        return cur.rowcount == 1
+
+    @classmethod
+    def bulk_upsert(
+        cls,
+        db: Database,
+        *,
+        session_id: str,
+        entries: Iterable[tuple[str, str, Optional[str]]],
+        check_time: Optional[str] = None,
+    ) -> tuple[int, int]:
+        """Upsert (StudentUserID, status, note) rows for one session in a single transaction.
+
+        New rows get check_time; existing rows keep theirs, and keep their note when none is given.
+        Returns (created, updated).
+        """
+        now = utc_now_iso()
+        params = [
+            (new_uuid(), session_id, uid, status, check_time, note, now)
+            for uid, status, note in entries
+        ]
+        if not params:
+            return 0, 0
+        with db.transaction():
+            before = cls.count_for_session(db, session_id)
+            cur = db.executemany(
+                """
+                INSERT INTO AttendanceRecord (RecordID, SessionID, StudentUserID, status, checkTime, note, updatedAt)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(SessionID, StudentUserID) DO UPDATE SET
+                    status=excluded.status,
+                    note=COALESCE(excluded.note, AttendanceRecord.note),
+                    updatedAt=excluded.updatedAt
+                """,
+                params,
+            )
+            created = cls.count_for_session(db, session_id) - before
+        return created, max(cur.rowcount - created, 0)
+
+    @classmethod
+    def count_for_session(cls, db: Database, session_id: str) -> int:
+        row = db.query_one("SELECT COUNT(*) AS c FROM AttendanceRecord WHERE SessionID=?", (session_id,))
+        return int(row["c"]) if row else 0
+
     @classmethod
     def load_by_id(cls, db: Database, record_id: str) -> Optional["AttendanceRecord"]:
         row = db.query_one("SELECT * FROM AttendanceRecord WHERE RecordID=?", (record_id,))
@@ -77,8 +140,12 @@ class AttendanceRecord:
 
     @classmethod
     def list_for_session(cls, db: Database, session_id: str) -> list["AttendanceRecord"]:
-        rows = db.query_all("SELECT * FROM AttendanceRecord WHERE SessionID=?", (session_id,))
-        return [cls.from_row(r) for r in rows]
+        return list(cls.iter_for_session(db, session_id))
+
+    @classmethod
+    def iter_for_session(cls, db: Database, session_id: str) -> Iterator["AttendanceRecord"]:
+        rows = db.query_iter("SELECT * FROM AttendanceRecord WHERE SessionID=?", (session_id,))
+        return (cls.from_row(r) for r in rows)
 
     @classmethod
     def from_row(cls, row) -> "AttendanceRecord":
@@ -14,6 +14,14 @@ class AttendanceReport:
     file_name: Optional[str] = None
     created_at: str = ""
     title: Optional[str] = None
+    class_name: Optional[str] = None
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    options: Optional[str] = None
+    fingerprint: Optional[str] = None
+    # stat of the written file, to tell a cached export from one overwritten at the same path
+    file_size: Optional[int] = None
+    file_mtime_ns: Optional[int] = None
 
     @classmethod
     def create(
@@ -23,6 +31,13 @@ class AttendanceReport:
         file_name: Optional[str] = None,
         managed_by_admin_user_id: Optional[str] = None,
         summarized_by_lecturer_user_id: Optional[str] = None,
+        class_name: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        options: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+        file_size: Optional[int] = None,
+        file_mtime_ns: Optional[int] = None,
     ) -> "AttendanceReport":
         return cls(
             report_id=new_uuid(),
@@ -31,21 +46,36 @@ class AttendanceReport:
             file_name=file_name,
             created_at=utc_now_iso(),
             title=title,
+            class_name=class_name,
+            date_from=date_from,
+            date_to=date_to,
+            options=options,
+            fingerprint=fingerprint,
+            file_size=file_size,
+            file_mtime_ns=file_mtime_ns,
         )
 
     def save(self, db: Database) -> None:
         db.execute(
             """
             INSERT INTO AttendanceReport (
-                ReportID, ManagedByAdminUserID, SummarizedByLecturerUserID, fileName, createdAt, title
+                ReportID, ManagedByAdminUserID, SummarizedByLecturerUserID, fileName, createdAt, title,
+                className, dateFrom, dateTo, options, fingerprint, fileSize, fileMtimeNs
             )
-            VALUES (?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(ReportID) DO UPDATE SET
                 ManagedByAdminUserID=excluded.ManagedByAdminUserID,
                 SummarizedByLecturerUserID=excluded.SummarizedByLecturerUserID,
                 fileName=excluded.fileName,
                 createdAt=excluded.createdAt,
-                title=excluded.title
+                title=excluded.title,
+                className=excluded.className,
+                dateFrom=excluded.dateFrom,
+                dateTo=excluded.dateTo,
+                options=excluded.options,
+                fingerprint=excluded.fingerprint,
+                fileSize=excluded.fileSize,
+                fileMtimeNs=excluded.fileMtimeNs
             """,
             (
                 self.report_id,
@@ -54,6 +84,13 @@ class AttendanceReport:
                 self.file_name,
                 self.created_at,
                 self.title,
+                self.class_name,
+                self.date_from,
+                self.date_to,
+                self.options,
+                self.fingerprint,
+                self.file_size,
+                self.file_mtime_ns,
             ),
         )
 
@@ -62,8 +99,26 @@ class AttendanceReport:
         row = db.query_one("SELECT * FROM AttendanceReport WHERE ReportID=?", (report_id,))
         return cls.from_row(row) if row else None
 
+    @classmethod
+    def find_by_fingerprint(cls, db: Database, class_name: str, fingerprint: str) -> list["AttendanceReport"]:
+        rows = db.query_all(
+            """
+            SELECT * FROM AttendanceReport
+            WHERE className=? AND fingerprint=?
+            ORDER BY createdAt DESC
+            """,
+            (class_name, fingerprint),
+        )
+        return [cls.from_row(r) for r in rows]
+
     @classmethod
     def from_row(cls, row) -> "AttendanceReport":
+        def _col(name: str, default=None):
+            try:
+                return row[name]
+            except Exception:
+                return default
+
         return cls(
             report_id=row["ReportID"],
             managed_by_admin_user_id=row["ManagedByAdminUserID"],
@@ -71,11 +126,11 @@ class AttendanceReport:
             file_name=row["fileName"],
             created_at=row["createdAt"],
             title=row["title"],
+            class_name=_col("className"),
+            date_from=_col("dateFrom"),
+            date_to=_col("dateTo"),
+            options=_col("options"),
+            fingerprint=_col("fingerprint"),
+            file_size=_col("fileSize"),
+            file_mtime_ns=_col("fileMtimeNs"),
         )
-
-
-    def generate(self, session_id: str) -> None:
-        raise NotImplementedError("Will be implemented with summary/export workflows")
-
-    def export_to_excel(self) -> None:
-        raise NotImplementedError("Will be implemented with Excel export")
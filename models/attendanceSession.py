@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterator, Optional
 
 from Database.database import Database, utc_now_iso
 
@@ -90,11 +90,15 @@ class AttendanceSession:
 
     @classmethod
     def list_by_lecturer(cls, db: Database, lecturer_user_id: str) -> list["AttendanceSession"]:
-        rows = db.query_all(
+        return list(cls.iter_by_lecturer(db, lecturer_user_id))
+
+    @classmethod
+    def iter_by_lecturer(cls, db: Database, lecturer_user_id: str) -> Iterator["AttendanceSession"]:
+        rows = db.query_iter(
             "SELECT * FROM AttendanceSession WHERE LecturerUserID=? ORDER BY createdAt DESC",
             (lecturer_user_id,),
         )
-        return [cls.from_row(r) for r in rows]
+        return (cls.from_row(r) for r in rows)
 
     @classmethod
     def from_row(cls, row) -> "AttendanceSession":
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from Database.database import Database, utc_now_iso
+
+
+@dataclass
+class Enrollment:
+
+    class_name: str
+    student_user_id: str
+    enrolled_at: str = ""
+
+    @classmethod
+    def create(cls, *, class_name: str, student_user_id: str) -> "Enrollment":
+        return cls(class_name=class_name, student_user_id=student_user_id, enrolled_at=utc_now_iso())
+
+    def save(self, db: Database) -> None:
+        db.execute(
+            """
+            INSERT INTO Enrollment (className, StudentUserID, enrolledAt)
+            VALUES (?, ?, ?)
+            ON CONFLICT(className, StudentUserID) DO UPDATE SET
+                enrolledAt=excluded.enrolledAt
+            """,
+            (self.class_name, self.student_user_id, self.enrolled_at),
+        )
+
+    def delete(self, db: Database) -> None:
+        db.execute(
+            "DELETE FROM Enrollment WHERE className=? AND StudentUserID=?",
+            (self.class_name, self.student_user_id),
+        )
+
+    @classmethod
+    def load(cls, db: Database, *, class_name: str, student_user_id: str) -> Optional["Enrollment"]:
+        row = db.query_one(
+            "SELECT * FROM Enrollment WHERE className=? AND StudentUserID=?",
+            (class_name, student_user_id),
+        )
+        return cls.from_row(row) if row else None
+
+    @classmethod
+    def list_for_class(cls, db: Database, class_name: str) -> list["Enrollment"]:
+        return list(cls.iter_for_class(db, class_name))
+
+    @classmethod
+    def iter_for_class(cls, db: Database, class_name: str) -> Iterator["Enrollment"]:
+        rows = db.query_iter("SELECT * FROM Enrollment WHERE className=?", (class_name,))
+        return (cls.from_row(r) for r in rows)
+
+    @classmethod
+    def has_roster(cls, db: Database, class_name: str) -> bool:
+        return db.query_one("SELECT 1 FROM Enrollment WHERE className=? LIMIT 1", (class_name,)) is not None
+
+    @classmethod
+    def import_roster(
+        cls, db: Database, class_name: str, student_ids: Iterable[str], *, replace: bool = False
+    ) -> tuple[int, list[str]]:
+        """Enroll StudentIDs in bulk. Returns (newly enrolled count, unknown StudentIDs)."""
+        wanted = list(dict.fromkeys(s for s in student_ids if s))
+        known: set[str] = set()
+        for i in range(0, len(wanted), 500):
+            chunk = wanted[i : i + 500]
+            rows = db.query_all(
+                f"SELECT StudentID FROM Student WHERE StudentID IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            known.update(r["StudentID"] for r in rows)
+        unknown = [s for s in wanted if s not in known]
+
+        now = utc_now_iso()
+        with db.transaction():
+            if replace:
+                db.execute("DELETE FROM Enrollment WHERE className=?", (class_name,))
+            before = cls.count_for_class(db, class_name)
+            db.executemany(
+                """
+                INSERT INTO Enrollment (className, StudentUserID, enrolledAt)
+                SELECT ?, UserID, ? FROM Student WHERE StudentID=?
+                ON CONFLICT(className, StudentUserID) DO NOTHING
+                """,
+                [(class_name, now, sid) for sid in wanted if sid in known],
+            )
+            added = cls.count_for_class(db, class_name) - before
+        return added, unknown
+
+    @classmethod
+    def count_for_class(cls, db: Database, class_name: str) -> int:
+        row = db.query_one("SELECT COUNT(*) AS c FROM Enrollment WHERE className=?", (class_name,))
+        return int(row["c"]) if row else 0
+
+    @classmethod
+    def from_row(cls, row) -> "Enrollment":
+        return cls(
+            class_name=row["className"],
+            student_user_id=row["StudentUserID"],
+            enrolled_at=row["enrolledAt"],
+        )
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterator, Optional
 
 from Database.database import Database, utc_now_iso
 
@@ -87,16 +87,24 @@ class LeaveRequest:
 
     @classmethod
     def list_for_student(cls, db: Database, student_user_id: str) -> list["LeaveRequest"]:
-        rows = db.query_all(
+        return list(cls.iter_for_student(db, student_user_id))
+
+    @classmethod
+    def iter_for_student(cls, db: Database, student_user_id: str) -> Iterator["LeaveRequest"]:
+        rows = db.query_iter(
             "SELECT * FROM LeaveRequest WHERE StudentUserID=? ORDER BY createdAt DESC",
             (student_user_id,),
         )
-        return [cls.from_row(r) for r in rows]
+        return (cls.from_row(r) for r in rows)
 
     @classmethod
     def list_for_lecturer(cls, db: Database, lecturer_user_id: str, *, pending_only: bool = False) -> list["LeaveRequest"]:
+        return list(cls.iter_for_lecturer(db, lecturer_user_id, pending_only=pending_only))
+
+    @classmethod
+    def iter_for_lecturer(cls, db: Database, lecturer_user_id: str, *, pending_only: bool = False) -> Iterator["LeaveRequest"]:
         if pending_only:
-            rows = db.query_all(
+            rows = db.query_iter(
                 """
                 SELECT * FROM LeaveRequest
                 WHERE LecturerUserID=? AND status='PENDING'
@@ -105,11 +113,11 @@ class LeaveRequest:
                 (lecturer_user_id,),
             )
         else:
-            rows = db.query_all(
+            rows = db.query_iter(
                 "SELECT * FROM LeaveRequest WHERE LecturerUserID=? ORDER BY createdAt DESC",
                 (lecturer_user_id,),
             )
-        return [cls.from_row(r) for r in rows]
+        return (cls.from_row(r) for r in rows)
 
     @classmethod
     def from_row(cls, row) -> "LeaveRequest":
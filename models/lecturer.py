@@ -15,16 +15,18 @@ class Lecturer(User):
 
 
     def save(self, db: Database) -> None:
-        super().save(db)
-        db.execute(
-            """
-            INSERT INTO Lecturer (UserID, LecturerID)
-            VALUES (?, ?)
-            ON CONFLICT(UserID) DO UPDATE SET
-                LecturerID=excluded.LecturerID
-            """,
-            (self.user_id, self.lecturer_id),
-        )
+        with db.transaction():
+            super().save(db)
+            db.execute(
+                """
+                INSERT INTO Lecturer (UserID, LecturerID)
+                VALUES (?, ?)
+                ON CONFLICT(UserID) DO UPDATE SET
+                    LecturerID=excluded.LecturerID
+                """,
+                (self.user_id, self.lecturer_id),
+            )
+        self._forget_principal(db)
 
     @classmethod
     def load_by_user_id(cls, db: Database, user_id: str) -> Optional["Lecturer"]:
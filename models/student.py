@@ -14,17 +14,19 @@ class Student(User):
     major_name: Optional[str] = None
 
     def save(self, db: Database) -> None:
-        super().save(db)
-        db.execute(
-            """
-            INSERT INTO Student (UserID, StudentID, majorName)
-            VALUES (?, ?, ?)
-            ON CONFLICT(UserID) DO UPDATE SET
-                StudentID=excluded.StudentID,
-                majorName=excluded.majorName
-            """,
-            (self.user_id, self.student_id, self.major_name),
-        )
+        with db.transaction():
+            super().save(db)
+            db.execute(
+                """
+                INSERT INTO Student (UserID, StudentID, majorName)
+                VALUES (?, ?, ?)
+                ON CONFLICT(UserID) DO UPDATE SET
+                    StudentID=excluded.StudentID,
+                    majorName=excluded.majorName
+                """,
+                (self.user_id, self.student_id, self.major_name),
+            )
+        self._forget_principal(db)
 
     @classmethod
     def load_by_user_id(cls, db: Database, user_id: str) -> Optional["Student"]:
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Optional
 
 from Database.database import Database, utc_now_iso
 from models.warning import Warning
@@ -37,15 +37,49 @@ class System:
         message: str,
     ) -> Warning:
        
-        self.save(db)
-        wid = IdGenerator(db).next_id("W", "Warning", "WarningID", width=3)
-        warning = Warning(
-            warning_id=wid,
-            student_user_id=student_user_id,
-            system_name=self.system_name,
-            class_name=class_name,
-            message=message,
-            created_at=utc_now_iso(),
-        )
-        warning.save(db)
+        with db.transaction():
+            self.save(db)
+            wid = IdGenerator(db).next_id("W", "Warning", "WarningID", width=3)
+            warning = Warning(
+                warning_id=wid,
+                student_user_id=student_user_id,
+                system_name=self.system_name,
+                class_name=class_name,
+                message=message,
+                created_at=utc_now_iso(),
+            )
+            warning.save(db)
         return warning
+
+    def send_warnings(
+        self,
+        db: Database,
+        *,
+        class_name: Optional[str],
+        items: Iterable[tuple[str, str, Optional[str]]],
+    ) -> int:
+        """Batch form of send_warning for (student_user_id, message, rule) items, in one transaction.
+
+        Items whose rule was already raised for the student in this class are skipped.
+        Returns the number of warnings written.
+        """
+        items = list(items)
+        if not items:
+            return 0
+        with db.transaction():
+            self.save(db)
+            ids = IdGenerator(db).next_ids("W", "Warning", "WarningID", len(items), width=3)
+            now = utc_now_iso()
+            warnings = [
+                Warning(
+                    warning_id=wid,
+                    student_user_id=uid,
+                    system_name=self.system_name,
+                    class_name=class_name,
+                    message=message,
+                    created_at=now,
+                    rule=rule,
+                )
+                for wid, (uid, message, rule) in zip(ids, items)
+            ]
+            return Warning.insert_many(db, warnings)
@@ -31,12 +31,13 @@ class User:
         address: Optional[str] = None,
         birth_date: Optional[str] = None,
         user_id: Optional[str] = None,
+        password_hash: Optional[str] = None,
     ) -> Self:  
         return cls(
             user_id=user_id or new_uuid(),
             full_name=full_name,
             email=email,
-            password_hash=hash_password(password),
+            password_hash=password_hash or hash_password(password),
             phone_number=phone_number,
             address=address,
             username=username,
@@ -68,6 +69,13 @@ class User:
                 self.birth_date,
             ),
         )
+        self._forget_principal(db)
+
+    def _forget_principal(self, db: Database) -> None:
+        # logins resolve through a TTL cache; drop this user so the saved profile/role shows at once
+        from services.principal_cache import PrincipalCache
+
+        PrincipalCache.for_db(db).invalidate(self.user_id)
 
     @classmethod
     def load_by_id(cls, db: Database, user_id: str) -> Optional[Self]:  
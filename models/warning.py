@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterable, Iterator, Optional
 
 from Database.database import Database
 
@@ -15,29 +15,52 @@ class Warning:
     class_name: Optional[str]
     message: str
     created_at: str  
+    # dedupe key of the policy rule that raised it; unique per (student, class) when set
+    rule: Optional[str] = None
 
     def save(self, db: Database) -> None:
         db.execute(
             """
-            INSERT INTO Warning (WarningID, StudentUserID, systemName, className, message, createdAt)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO Warning (WarningID, StudentUserID, systemName, className, message, createdAt, rule)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
             ON CONFLICT(WarningID) DO UPDATE SET
                 StudentUserID=excluded.StudentUserID,
                 systemName=excluded.systemName,
                 className=excluded.className,
                 message=excluded.message,
-                createdAt=excluded.createdAt
+                createdAt=excluded.createdAt,
+                rule=excluded.rule
             """,
-            (
-                self.warning_id,
-                self.student_user_id,
-                self.system_name,
-                self.class_name,
-                self.message,
-                self.created_at,
-            ),
+            self._params(),
+        )
+
+    def _params(self) -> tuple:
+        return (
+            self.warning_id,
+            self.student_user_id,
+            self.system_name,
+            self.class_name,
+            self.message,
+            self.created_at,
+            self.rule,
         )
 
+    @classmethod
+    def insert_many(cls, db: Database, warnings: Iterable["Warning"]) -> int:
+        """Insert in one statement batch; rows whose (student, class, rule) already exists are skipped."""
+        params = [w._params() for w in warnings]
+        if not params:
+            return 0
+        cur = db.executemany(
+            """
+            INSERT INTO Warning (WarningID, StudentUserID, systemName, className, message, createdAt, rule)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(StudentUserID, COALESCE(className, ''), rule) WHERE rule IS NOT NULL DO NOTHING
+            """,
+            params,
+        )
+        return max(cur.rowcount, 0)
+
     @classmethod
     def load_by_id(cls, db: Database, warning_id: str) -> Optional["Warning"]:
         row = db.query_one("SELECT * FROM Warning WHERE WarningID=?", (warning_id,))
@@ -45,11 +68,15 @@ class Warning:
 
     @classmethod
     def list_for_student(cls, db: Database, student_user_id: str) -> list["Warning"]:
-        rows = db.query_all(
+        return list(cls.iter_for_student(db, student_user_id))
+
+    @classmethod
+    def iter_for_student(cls, db: Database, student_user_id: str) -> Iterator["Warning"]:
+        rows = db.query_iter(
             "SELECT * FROM Warning WHERE StudentUserID=? ORDER BY createdAt DESC",
             (student_user_id,),
         )
-        return [cls.from_row(r) for r in rows]
+        return (cls.from_row(r) for r in rows)
 
     @classmethod
     def from_row(cls, row) -> "Warning":
@@ -66,4 +93,5 @@ class Warning:
             class_name=_col("className"),
             message=row["message"],
             created_at=row["createdAt"],
+            rule=_col("rule"),
         )
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+import threading
+import weakref
+from typing import Callable, Generic, Optional, TypeVar
+
+from Database.database import Database
+
+T = TypeVar("T")
+
+
+class PerDatabase(Generic[T]):
+    """One shared instance per Database, created on first use and dropped with the Database."""
+
+    def __init__(self) -> None:
+        self._items: "weakref.WeakKeyDictionary[Database, T]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, db: Database) -> Optional[T]:
+        return self._items.get(db)
+
+    def get_or_create(self, db: Database, factory: Callable[[], T]) -> T:
+        """The instance for db; factory runs under the lock, so at most one is ever built."""
+        with self._lock:
+            item = self._items.get(db)
+            if item is None:
+                item = factory()
+                self._items[db] = item
+            return item
+
+    def pop(self, db: Database) -> Optional[T]:
+        with self._lock:
+            return self._items.pop(db, None)
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Optional
+
+from Database.database import Database
+from services._registry import PerDatabase
+
+# int8 codes in the matrix; 0 = no record for that student in that session
+STATUS_CODES = {"Present": 1, "Late": 2, "Absent": 3, "Excused": 4}
+NO_RECORD = 0
+
+
+def require_numpy() -> Any:
+    try:
+        import numpy
+    except Exception:
+        raise RuntimeError("Missing dependency: numpy (pip install numpy)") from None
+    return numpy
+
+
+@dataclass
+class AttendanceMatrix:
+    """A class's attendance as a students x sessions int8 matrix of STATUS_CODES."""
+
+    class_name: str
+    version: str
+    student_user_ids: list[str]
+    student_ids: list[str]
+    student_names: list[str]
+    session_ids: list[str]
+    session_dates: list[str]
+    codes: Any  # numpy.ndarray, shape (students, sessions), dtype int8
+
+    def counts(self) -> dict[str, Any]:
+        """Per-student totals for every status (arrays aligned with student_ids)."""
+        return {name: (self.codes == code).sum(axis=1) for name, code in STATUS_CODES.items()}
+
+    def run_lengths(self, code: int) -> Any:
+        """Length of the run of `code` ending at each session, per student (same shape as codes).
+
+        Sessions without a record (still open, or not on the student's roster then) neither extend
+        nor break a run; they carry the current length.
+        """
+        np = require_numpy()
+        hit = self.codes == code
+        if hit.size == 0:
+            return np.zeros(hit.shape, dtype=np.int32)
+        breaks = (self.codes != NO_RECORD) & ~hit
+        c = np.cumsum(hit, axis=1, dtype=np.int32)
+        # cumulative count at the last break, carried forward
+        base = np.maximum.accumulate(np.where(breaks, c, 0), axis=1)
+        return c - base
+
+    def trailing_run(self, code: int, through_session: Optional[str] = None) -> Any:
+        """Per student, the run of `code` at through_session (default: the last session), counting
+        only sessions the student has a record for, so an open or later session does not hide it."""
+        np = require_numpy()
+        if not self.session_ids:
+            return np.zeros(len(self.student_ids), dtype=np.int32)
+        col = -1
+        if through_session is not None and through_session in self.session_ids:
+            col = self.session_ids.index(through_session)
+        return self.run_lengths(code)[:, col]
+
+
+class AttendanceAnalytics:
+    """Vectorized cross-session analytics over per-class attendance matrices.
+
+    Matrices are cached per class and keyed by AttendanceService.class_data_version(), so a
+    repeat call costs one aggregate query until the class's records change.
+    """
+
+    _registry: "PerDatabase[AttendanceAnalytics]" = PerDatabase()
+
+    def __init__(self, db: Database, *, max_classes: int = 64) -> None:
+        self.db = db
+        self.max_classes = max_classes
+        self._matrices: dict[str, AttendanceMatrix] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: Database) -> "AttendanceAnalytics":
+        return cls._registry.get_or_create(db, lambda: cls(db))
+
+    def data_version(self, class_name: str) -> str:
+        from services.attendance_service import AttendanceService
+
+        return AttendanceService(self.db).class_data_version(class_name=class_name)
+
+    def matrix(self, class_name: str) -> AttendanceMatrix:
+        version = self.data_version(class_name)
+        with self._lock:
+            cached = self._matrices.get(class_name)
+        if cached is not None and cached.version == version:
+            return cached
+        m = self._load(class_name, version)
+        with self._lock:
+            if len(self._matrices) >= self.max_classes:
+                self._matrices.clear()
+            self._matrices[class_name] = m
+        return m
+
+    def invalidate(self, class_name: Optional[str] = None) -> None:
+        with self._lock:
+            if class_name is None:
+                self._matrices.clear()
+            else:
+                self._matrices.pop(class_name, None)
+
+    def _load(self, class_name: str, version: str) -> AttendanceMatrix:
+        np = require_numpy()
+        sessions = list(
+            self.db.query_iter(
+                """
+                SELECT SessionID, date FROM AttendanceSession
+                WHERE className=?
+                ORDER BY date, COALESCE(startTime, ''), SessionID
+                """,
+                (class_name,),
+                row_factory="tuple",
+            )
+        )
+        students = list(
+            self.db.query_iter(
+                """
+                SELECT st.UserID, st.StudentID, u.fullname
+                FROM Student st
+                JOIN User u ON u.UserID = st.UserID
+                WHERE st.UserID IN (
+                    SELECT ar.StudentUserID
+                    FROM AttendanceRecord ar
+                    JOIN AttendanceSession s ON s.SessionID = ar.SessionID
+                    WHERE s.className=?
+                )
+                ORDER BY u.fullname, st.StudentID
+                """,
+                (class_name,),
+                row_factory="tuple",
+            )
+        )
+        col = {sid: j for j, (sid, _) in enumerate(sessions)}
+        row = {uid: i for i, (uid, _, _) in enumerate(students)}
+        codes = np.zeros((len(students), len(sessions)), dtype=np.int8)
+
+        records = [
+            (row[uid], col[sid], STATUS_CODES.get(status, NO_RECORD))
+            for uid, sid, status in self.db.query_iter(
+                """
+                SELECT ar.StudentUserID, ar.SessionID, ar.status
+                FROM AttendanceRecord ar
+                JOIN AttendanceSession s ON s.SessionID = ar.SessionID
+                WHERE s.className=?
+                """,
+                (class_name,),
+                chunk_size=5000,
+                row_factory="tuple",
+            )
+            # the three reads are separate statements: skip records of sessions/students that
+            # appeared after the earlier reads (the class version moves, so the next call reloads)
+            if uid in row and sid in col
+        ]
+        if records:
+            idx = np.array(records, dtype=np.int64)
+            codes[idx[:, 0], idx[:, 1]] = idx[:, 2]
+
+        return AttendanceMatrix(
+            class_name=class_name,
+            version=version,
+            student_user_ids=[s[0] for s in students],
+            student_ids=[s[1] for s in students],
+            student_names=[s[2] for s in students],
+            session_ids=[s[0] for s in sessions],
+            session_dates=[s[1] for s in sessions],
+            codes=codes,
+        )
+
+    def student_stats(self, class_name: str) -> list[dict]:
+        """Per-student counts, attendance rate (Present / recorded, as in summarize_class) and streaks."""
+        np = require_numpy()
+        m = self.matrix(class_name)
+        counts = m.counts()
+        recorded = (m.codes != NO_RECORD).sum(axis=1)
+        rate = np.divide(counts["Present"], recorded, out=np.zeros(len(recorded)), where=recorded > 0)
+        runs = m.run_lengths(STATUS_CODES["Absent"])
+        longest = runs.max(axis=1) if runs.shape[1] else np.zeros(len(recorded), dtype=np.int32)
+        current = m.trailing_run(STATUS_CODES["Absent"])
+        return [
+            {
+                "StudentUserID": m.student_user_ids[i],
+                "StudentID": m.student_ids[i],
+                "StudentName": m.student_names[i],
+                "Present": int(counts["Present"][i]),
+                "Late": int(counts["Late"][i]),
+                "Absent": int(counts["Absent"][i]),
+                "Excused": int(counts["Excused"][i]),
+                "Recorded": int(recorded[i]),
+                "Rate": float(rate[i]),
+                "CurrentAbsenceStreak": int(current[i]),
+                "LongestAbsenceStreak": int(longest[i]),
+            }
+            for i in range(len(m.student_ids))
+        ]
+
+    def weekly_trends(self, class_name: str) -> list[dict]:
+        """Per ISO week: sessions held, records and the share of each status."""
+        np = require_numpy()
+        m = self.matrix(class_name)
+        if not m.session_ids:
+            return []
+        weeks = []
+        for d in m.session_dates:
+            try:
+                y, w, _ = date.fromisoformat(d).isocalendar()
+                weeks.append(f"{y}-W{w:02d}")
+            except ValueError:
+                weeks.append("unknown")
+        labels, inverse = np.unique(np.array(weeks), return_inverse=True)
+        per_session = {name: (m.codes == code).sum(axis=0) for name, code in STATUS_CODES.items()}
+        recorded = np.bincount(inverse, weights=(m.codes != NO_RECORD).sum(axis=0), minlength=len(labels))
+        sessions = np.bincount(inverse, minlength=len(labels))
+        totals = {
+            name: np.bincount(inverse, weights=v, minlength=len(labels)) for name, v in per_session.items()
+        }
+        out = []
+        for k, label in enumerate(labels):
+            n = recorded[k]
+            row = {"Week": str(label), "Sessions": int(sessions[k]), "Records": int(n)}
+            for name in STATUS_CODES:
+                row[f"{name}Rate"] = float(totals[name][k] / n) if n else 0.0
+            out.append(row)
+        return out
+
+    def at_risk(
+        self,
+        class_name: str,
+        *,
+        min_rate: float = 0.8,
+        max_absences: int = 3,
+        streak: int = 3,
+    ) -> list[dict]:
+        """Students below min_rate, at max_absences or more, or currently `streak` absences in a row."""
+        out = []
+        for s in self.student_stats(class_name):
+            reasons = []
+            if s["Recorded"] and s["Rate"] < min_rate:
+                reasons.append(f"rate {s['Rate']:.0%}")
+            if s["Absent"] >= max_absences:
+                reasons.append(f"{s['Absent']} absences")
+            if s["CurrentAbsenceStreak"] >= streak:
+                reasons.append(f"{s['CurrentAbsenceStreak']} absences in a row")
+            if reasons:
+                out.append({**s, "Reasons": reasons})
+        out.sort(key=lambda s: (s["Rate"], -s["Absent"]))
+        return out
@@ -2,22 +2,105 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from functools import lru_cache
+from typing import Iterable, Iterator, Optional
+import base64
+import json
+import os
 import re
 import sqlite3
+import time
+import tracemalloc
 
-from Database.database import Database, utc_now_iso
+from Database.database import UUID_SQL, Database, utc_now_iso
 from models.attendanceSession import AttendanceSession
+from models.attendanceCounter import AttendanceCounter
 from models.attendanceRecord import AttendanceRecord
+from models.enrollment import Enrollment
 from models.leaveRequest import LeaveRequest
-from models.warning import Warning
 
+from services.bitset_index import BitsetIndex
+from services.checkin_writer import CheckInWriter
 from services.id_generator import IdGenerator
+from services.session_cache import OpenSessionCache, session_expiry
+from services.warning_policy import AbsoluteAbsences, WarningPolicy, load_warning_policy
+
+RECORD_STATUSES = ("Present", "Late", "Absent", "Excused")
+
+_SESSION_ID_RE = re.compile(r"(S\d+)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def _normalize_session_id(raw: str) -> str:
+    s = raw.strip()
+    if s.startswith("<") and s.endswith(">"):
+        s = s[1:-1].strip()
+
+    m = _SESSION_ID_RE.search(s)
+    if m:
+        return m.group(1).upper()
+
+    return s.upper()
+
+
+def _encode_page_token(key: tuple[str, str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode("utf-8")).decode("ascii")
+
+
+def _decode_page_token(token: str) -> Optional[tuple[str, str, str]]:
+    try:
+        date, check_time, record_id = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        return str(date), str(check_time), str(record_id)
+    except Exception:
+        return None
+
+
+def _class_range_where(
+    class_name: str, date_from: Optional[str], date_to: Optional[str]
+) -> tuple[list[str], list[object]]:
+    where = ["s.className=?"]
+    params: list[object] = [class_name]
+    if date_from:
+        where.append("s.date>=?")
+        params.append(date_from)
+    if date_to:
+        where.append("s.date<=?")
+        params.append(date_to)
+    return where, params
+
+
+def _sort_sheet_rows(ws, first_row: int, key) -> None:
+    """Reorder the data rows from first_row down in place; rows appended by an incremental update
+    land at the bottom, while a full export writes them in query order."""
+    rows = [list(r) for r in ws.iter_rows(min_row=first_row, values_only=True)]
+    ordered = sorted(rows, key=key)
+    if ordered == rows:
+        return
+    for i, values in enumerate(ordered):
+        for col, v in enumerate(values, 1):
+            ws.cell(row=first_row + i, column=col, value=v)
+
+
+REPORT_SHEET = "Attendance Report"
+DETAIL_SHEET = "Session Details"
+META_SHEET = "_meta"
+SUMMARY_FIRST_ROW = 6  # rows 1-5: class, from, to, blank, column headers
+
+
+@dataclass
+class ExportStats:
+    summary_rows: int = 0
+    detail_rows: int = 0
+    seconds: float = 0.0
+    peak_memory_bytes: Optional[int] = None
+    incremental: bool = False
 
 
 @dataclass
 class AttendanceService:
     db: Database
+    last_export_stats: Optional[ExportStats] = None
+    warning_policy: Optional[WarningPolicy] = None
 
     def __post_init__(self) -> None:
 
@@ -26,18 +109,20 @@ class AttendanceService:
             ensure()
 
    
-    @staticmethod
-    def normalize_session_id(raw: str) -> str:
-        s = (raw or "").strip()
-        if s.startswith("<") and s.endswith(">"):
-            s = s[1:-1].strip()
+    @property
+    def session_cache(self) -> OpenSessionCache:
+        return OpenSessionCache.for_db(self.db)
 
-      
-        m = re.search(r"(S\d+)", s, re.IGNORECASE)
-        if m:
-            return m.group(1).upper()
+    def _session_changed(self, session_id: str) -> None:
+        """Hook for every write path touching a session or its records."""
+        self.session_cache.invalidate(session_id)
+        index = BitsetIndex.peek(self.db)
+        if index is not None:
+            index.mark_dirty(session_id)
 
-        return s.upper()
+    @staticmethod
+    def normalize_session_id(raw: str) -> str:
+        return _normalize_session_id(raw or "")
 
     @staticmethod
     def normalize_student_id(raw: str) -> str:
@@ -73,21 +158,23 @@ class AttendanceService:
         require_pin: bool,
         pin: Optional[str],
     ) -> AttendanceSession:
-        gen = IdGenerator(self.db)
-        session_id = gen.next_id("S", "AttendanceSession", "SessionID", width=3)
+        with self.db.transaction():
+            gen = IdGenerator(self.db)
+            session_id = gen.next_id("S", "AttendanceSession", "SessionID", width=3)
 
-        session = AttendanceSession.create(
-            session_id=session_id,
-            lecturer_user_id=lecturer_user_id,
-            class_name=class_name,
-            date=date,
-            start_time=start_time,
-            duration_minutes=duration_minutes,
-            require_pin=require_pin,
-            pin=pin,
-            status="OPEN",
-        )
-        session.save(self.db)
+            session = AttendanceSession.create(
+                session_id=session_id,
+                lecturer_user_id=lecturer_user_id,
+                class_name=class_name,
+                date=date,
+                start_time=start_time,
+                duration_minutes=duration_minutes,
+                require_pin=require_pin,
+                pin=pin,
+                status="OPEN",
+            )
+            session.save(self.db)
+        self._session_changed(session.session_id)
         return session
 
     def close_session(self, session_id: str, lecturer_user_id: str) -> bool:
@@ -95,56 +182,75 @@ class AttendanceService:
         session = AttendanceSession.load_by_id(self.db, session_id)
         if not session or session.lecturer_user_id != lecturer_user_id:
             return False
-        session.status = "CLOSED"
-        session.save(self.db)
-
-     
-        self._ensure_absent_records_on_close(session=session)
+        with self.db.transaction():
+            session.status = "CLOSED"
+            session.save(self.db)
 
+            self._ensure_absent_records_on_close(session=session)
 
-        self.generate_warnings_for_all_students(class_name=session.class_name, threshold_absent=3)
+            self._generate_warnings_for_session(session)
+        self._session_changed(session_id)
         return True
 
-    def _ensure_absent_records_on_close(self, *, session: AttendanceSession) -> None:
-        """When a session closes, create Absent records for students without any record in that session."""
-        students = self.db.query_all("SELECT UserID FROM Student")
-        for s in students:
-            uid = s["UserID"]
-            existed = AttendanceRecord.load_by_session_and_student(
-                self.db, session_id=session.session_id, student_user_id=uid
+    def _ensure_absent_records_on_close(self, *, session: AttendanceSession) -> int:
+        """When a session closes, create Absent records for students without any record in that session.
+
+        Returns the number of records inserted.
+        """
+        roster_sql, roster_params = self._roster_query(session.class_name)
+        cur = self.db.execute(
+            f"""
+            INSERT INTO AttendanceRecord (RecordID, SessionID, StudentUserID, status, checkTime, note, updatedAt)
+            SELECT {UUID_SQL}, ?, st.UserID, 'Absent', NULL, NULL, ?
+            FROM ({roster_sql}) st
+            WHERE NOT EXISTS (
+                SELECT 1 FROM AttendanceRecord ar
+                WHERE ar.SessionID = ? AND ar.StudentUserID = st.UserID
             )
-            if existed:
-                continue
-            AttendanceRecord.create(
-                session_id=session.session_id,
-                student_user_id=uid,
-                status="Absent",
-                check_time=None,
-                note=None,
-            ).save(self.db)
+            """,
+            (session.session_id, utc_now_iso(), *roster_params, session.session_id),
+        )
+        return max(cur.rowcount, 0)
+
+    def _roster_query(self, class_name: str) -> tuple[str, tuple]:
+        """SQL yielding the UserIDs a class's sessions cover.
+
+        Classes without an imported roster keep the old behaviour and cover every student.
+        """
+        if Enrollment.has_roster(self.db, class_name):
+            return "SELECT StudentUserID AS UserID FROM Enrollment WHERE className=?", (class_name,)
+        return "SELECT UserID FROM Student", ()
+
+    def _session_class(self, session_id: str) -> Optional[str]:
+        row = self.db.query_one("SELECT className FROM AttendanceSession WHERE SessionID=?", (session_id,))
+        return row["className"] if row else None
+
+    def import_roster(self, *, class_name: str, student_ids: list[str], replace: bool = False) -> tuple[bool, str]:
+        ids = [self.normalize_student_id(s) for s in student_ids]
+        ids = [s for s in ids if s]
+        if not ids:
+            return False, "No StudentIDs given."
+        added, unknown = Enrollment.import_roster(self.db, class_name, ids, replace=replace)
+        msg = f"Roster updated: {added} enrolled, {Enrollment.count_for_class(self.db, class_name)} total."
+        if unknown:
+            shown = ", ".join(unknown[:10]) + (" ..." if len(unknown) > 10 else "")
+            msg += f" Unknown StudentIDs ({len(unknown)}): {shown}"
+        return True, msg
 
     def is_session_open(self, session: AttendanceSession) -> bool:
         if session.status != "OPEN":
             return False
-       
-        if session.start_time and session.duration_minutes:
-            try:
-                start = datetime.strptime(f"{session.date} {session.start_time}", "%Y-%m-%d %H:%M")
-                end = start + timedelta(minutes=int(session.duration_minutes))
-                if datetime.now() > end:
-                    return False
-            except Exception:
-                pass
-        return True
-
+        expires_at = session_expiry(session)
+        return expires_at is None or datetime.now() <= expires_at
 
     def student_check_in(self, *, student_user_id: str, session_id: str, pin: Optional[str]) -> tuple[bool, str]:
         session_id = self.normalize_session_id(session_id)
 
-        session = AttendanceSession.load_by_id(self.db, session_id)
+        cache = self.session_cache
+        session = cache.get(session_id)
         if not session:
             return False, "Session ID not found."
-        if not self.is_session_open(session):
+        if not session.is_open():
             return False, "Session is closed or expired."
 
         if session.require_pin:
@@ -153,10 +259,7 @@ class AttendanceService:
             if session.pin and pin != session.pin:
                 return False, "Invalid or expired PIN."
 
-        existed = AttendanceRecord.load_by_session_and_student(
-            self.db, session_id=session_id, student_user_id=student_user_id
-        )
-        if existed:
+        if not cache.claim(session_id, student_user_id):
             return False, "Attendance already recorded for this student in the session."
 
         record = AttendanceRecord.create(
@@ -166,7 +269,33 @@ class AttendanceService:
             check_time=utc_now_iso(),
             note=None,
         )
-        record.save(self.db)
+        writer = CheckInWriter.get(self.db)
+        try:
+            if writer is not None:
+                outcome = writer.submit(record).result()
+            else:
+                outcome = "ok" if record.insert_if_session_open(self.db) else "closed"
+        except sqlite3.IntegrityError as e:
+            if "UNIQUE" not in str(e):
+                cache.release(session_id, student_user_id)
+                raise
+            outcome = "duplicate"
+        except (sqlite3.OperationalError, RuntimeError):
+            # still busy after the retries, or the write-behind writer was shut down
+            cache.release(session_id, student_user_id)
+            return False, "Check-in could not be recorded right now. Please try again."
+        except BaseException:
+            cache.release(session_id, student_user_id)
+            raise
+
+        if outcome == "duplicate":
+            return False, "Attendance already recorded for this student in the session."
+        if outcome == "closed":
+            cache.invalidate(session_id)
+            return False, "Session is closed or expired."
+        index = BitsetIndex.peek(self.db)
+        if index is not None:
+            index.record(session_id, student_user_id, "Present")
         return True, "Check-in successful."
 
     def view_attendance(
@@ -233,21 +362,22 @@ class AttendanceService:
         if not session:
             return False, "Session ID not found."
 
-        gen = IdGenerator(self.db)
-        request_id = gen.next_id("R", "LeaveRequest", "RequestID", width=3)
+        with self.db.transaction():
+            gen = IdGenerator(self.db)
+            request_id = gen.next_id("R", "LeaveRequest", "RequestID", width=3)
 
-        req = LeaveRequest.create(
-            request_id=request_id,
-            student_user_id=student_user_id,
-            lecturer_user_id=session.lecturer_user_id,
-            session_id=session_id,
-            request_type=request_type,
-            reason=reason,
-            evidence_path=evidence_path,
-            status="PENDING",
-            note=None,
-        )
-        req.save(self.db)
+            req = LeaveRequest.create(
+                request_id=request_id,
+                student_user_id=student_user_id,
+                lecturer_user_id=session.lecturer_user_id,
+                session_id=session_id,
+                request_type=request_type,
+                reason=reason,
+                evidence_path=evidence_path,
+                status="PENDING",
+                note=None,
+            )
+            req.save(self.db)
         return True, "Request submitted."
 
     def list_requests_for_student(self, student_user_id: str) -> list[LeaveRequest]:
@@ -271,47 +401,53 @@ class AttendanceService:
             return False, "Invalid request status."
 
         new_status = "APPROVED" if approve else "REJECTED"
-        req.set_status(self.db, new_status, note=lecturer_comment)
-
-     
-        if new_status == "APPROVED" and req.session_id:
-            sid = self.normalize_session_id(req.session_id)
-            att_status = "Excused" if req.request_type == "Absent" else "Late"
-            rec = AttendanceRecord.load_by_session_and_student(
-                self.db, session_id=sid, student_user_id=req.student_user_id
-            )
-            if rec:
-                rec.status = att_status
-                if lecturer_comment:
-                    rec.note = lecturer_comment
-                rec.updated_at = utc_now_iso()
-                rec.save(self.db)
-            else:
-                AttendanceRecord.create(
-                    session_id=sid,
-                    student_user_id=req.student_user_id,
-                    status=att_status,
-                    check_time=None,
-                    note=lecturer_comment,
-                ).save(self.db)
+        with self.db.transaction():
+            req.set_status(self.db, new_status, note=lecturer_comment)
+
+            if new_status == "APPROVED" and req.session_id:
+                sid = self.normalize_session_id(req.session_id)
+                att_status = "Excused" if req.request_type == "Absent" else "Late"
+                rec = AttendanceRecord.load_by_session_and_student(
+                    self.db, session_id=sid, student_user_id=req.student_user_id
+                )
+                if rec:
+                    rec.status = att_status
+                    if lecturer_comment:
+                        rec.note = lecturer_comment
+                    rec.updated_at = utc_now_iso()
+                    rec.save(self.db)
+                else:
+                    AttendanceRecord.create(
+                        session_id=sid,
+                        student_user_id=req.student_user_id,
+                        status=att_status,
+                        check_time=None,
+                        note=lecturer_comment,
+                    ).save(self.db)
+                self._session_changed(sid)
 
         return True, f"Request {new_status}."
 
 
     def list_session_students(self, session_id: str) -> list[dict]:
         session_id = self.normalize_session_id(session_id)
+        class_name = self._session_class(session_id)
+        if class_name is None:
+            return []
+        roster_sql, roster_params = self._roster_query(class_name)
 
         rows = self.db.query_all(
-            """
+            f"""
             SELECT s.UserID AS StudentUserID, s.StudentID, u.fullname,
                    COALESCE(ar.status,'Absent') AS status
-            FROM Student s
+            FROM ({roster_sql}) r
+            JOIN Student s ON s.UserID = r.UserID
             JOIN User u ON u.UserID = s.UserID
             LEFT JOIN AttendanceRecord ar
                 ON ar.StudentUserID = s.UserID AND ar.SessionID = ?
             ORDER BY u.fullname
             """,
-            (session_id,),
+            (*roster_params, session_id),
         )
         return [
             {
@@ -354,6 +490,7 @@ class AttendanceService:
                 rec.note = note
                 rec.updated_at = utc_now_iso()
                 rec.save(self.db)
+                self._session_changed(session_id)
                 return True, "Updated."
 
             
@@ -368,6 +505,7 @@ class AttendanceService:
                 note=note,
             )
             rec.save(self.db)
+            self._session_changed(session_id)
             return True, "Created."
 
         except sqlite3.IntegrityError:
@@ -378,28 +516,65 @@ class AttendanceService:
     def mark_all_present(self, session_id: str) -> tuple[bool, str]:
         session_id = self.normalize_session_id(session_id)
 
-        s_exist = self.db.query_one("SELECT 1 FROM AttendanceSession WHERE SessionID=?", (session_id,))
-        if not s_exist:
+        class_name = self._session_class(session_id)
+        if class_name is None:
             return False, "Session ID not found."
 
-        students = self.db.query_all("SELECT UserID FROM Student")
-        for s in students:
-            uid = s["UserID"]
-            rec = AttendanceRecord.load_by_session_and_student(self.db, session_id=session_id, student_user_id=uid)
-            if not rec:
-                AttendanceRecord.create(
-                    session_id=session_id,
-                    student_user_id=uid,
-                    status="Present",
-                    check_time=utc_now_iso(),
-                    note=None,
-                ).save(self.db)
-            else:
-                rec.status = "Present"
-                rec.updated_at = utc_now_iso()
-                rec.save(self.db)
+        roster_sql, roster_params = self._roster_query(class_name)
+        students = self.db.query_all(roster_sql, roster_params)
+        created, updated = AttendanceRecord.bulk_upsert(
+            self.db,
+            session_id=session_id,
+            entries=[(s["UserID"], "Present", None) for s in students],
+            check_time=utc_now_iso(),
+        )
+        self._session_changed(session_id)
+        return True, f"Batch updated: {created} created, {updated} updated."
 
-        return True, "Batch updated."
+    def apply_status_sheet(
+        self, session_id: str, entries: list[tuple[str, str, Optional[str]]]
+    ) -> tuple[bool, str]:
+        """Apply many (StudentID, status, note) changes to one session at once."""
+        session_id = self.normalize_session_id(session_id)
+        if self._session_class(session_id) is None:
+            return False, "Session ID not found."
+
+        statuses = {s.lower(): s for s in RECORD_STATUSES}
+        rows: list[tuple[str, str, Optional[str]]] = []
+        bad: list[str] = []
+        for student_id, status, note in entries:
+            sid = self.normalize_student_id(student_id)
+            st = statuses.get((status or "").strip().lower())
+            if not sid or not st:
+                bad.append(sid or "?")
+                continue
+            rows.append((sid, st, note or None))
+
+        user_ids = self._student_user_ids([sid for sid, _, _ in rows])
+        bad.extend(sid for sid, _, _ in rows if sid not in user_ids)
+        created, updated = AttendanceRecord.bulk_upsert(
+            self.db,
+            session_id=session_id,
+            entries=[(user_ids[sid], st, note) for sid, st, note in rows if sid in user_ids],
+        )
+        self._session_changed(session_id)
+        msg = f"Batch updated: {created} created, {updated} updated."
+        if bad:
+            shown = ", ".join(bad[:10]) + (" ..." if len(bad) > 10 else "")
+            msg += f" Skipped ({len(bad)}): {shown}"
+        return True, msg
+
+    def _student_user_ids(self, student_ids: list[str]) -> dict[str, str]:
+        out: dict[str, str] = {}
+        unique = list(dict.fromkeys(student_ids))
+        for i in range(0, len(unique), 500):
+            chunk = unique[i : i + 500]
+            rows = self.db.query_all(
+                f"SELECT StudentID, UserID FROM Student WHERE StudentID IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            out.update((r["StudentID"], r["UserID"]) for r in rows)
+        return out
 
  
     def summarize_class(
@@ -409,50 +584,130 @@ class AttendanceService:
         date_from: Optional[str],
         date_to: Optional[str],
     ) -> list[dict]:
-        where = ["s.className=?"]
-        params: list[object] = [class_name]
-        if date_from:
-            where.append("s.date>=?")
-            params.append(date_from)
-        if date_to:
-            where.append("s.date<=?")
-            params.append(date_to)
+        return list(self.iter_class_summary(class_name=class_name, date_from=date_from, date_to=date_to))
 
-        rows = self.db.query_all(
+    def iter_class_summary(
+        self,
+        *,
+        class_name: str,
+        date_from: Optional[str],
+        date_to: Optional[str],
+        chunk_size: int = 500,
+        student_user_ids: Optional[Iterable[str]] = None,
+    ) -> Iterator[dict]:
+        """summarize_class() as a stream, one row per student, fetched chunk_size at a time.
+
+        student_user_ids limits the summary to those students (incremental report updates).
+        """
+        only = ""
+        only_params: list[object] = []
+        if student_user_ids is not None:
+            only = "AND st.UserID IN (SELECT value FROM json_each(?))"
+            only_params = [json.dumps(list(student_user_ids))]
+        if not date_from and not date_to:
+            # whole-history summaries come from the trigger-maintained counters: O(class size)
+            rows = self.db.query_iter(
+                f"""
+                SELECT st.StudentID, u.fullname, c.Present, c.Late, c.Absent, c.Excused, c.Total
+                FROM AttendanceCounter c
+                JOIN Student st ON st.UserID = c.StudentUserID
+                JOIN User u ON u.UserID = c.StudentUserID
+                WHERE c.className=? AND c.Total > 0 {only}
+                ORDER BY u.fullname, st.StudentID
+                """,
+                (class_name, *only_params),
+                chunk_size=chunk_size,
+            )
+        else:
+            where, params = _class_range_where(class_name, date_from, date_to)
+
+            rows = self.db.query_iter(
+                f"""
+                SELECT st.StudentID, u.fullname,
+                       SUM(CASE WHEN ar.status='Present' THEN 1 ELSE 0 END) AS Present,
+                       SUM(CASE WHEN ar.status='Late' THEN 1 ELSE 0 END) AS Late,
+                       SUM(CASE WHEN ar.status='Absent' THEN 1 ELSE 0 END) AS Absent,
+                       SUM(CASE WHEN ar.status='Excused' THEN 1 ELSE 0 END) AS Excused,
+                       COUNT(ar.RecordID) AS Total
+                FROM Student st
+                JOIN User u ON u.UserID = st.UserID
+                LEFT JOIN AttendanceRecord ar ON ar.StudentUserID = st.UserID
+                LEFT JOIN AttendanceSession s ON s.SessionID = ar.SessionID
+                WHERE {' AND '.join(where)} {only}
+                GROUP BY st.StudentID, u.fullname
+                ORDER BY u.fullname, st.StudentID
+                """,
+                [*params, *only_params],
+                chunk_size=chunk_size,
+            )
+        for r in rows:
+            total = int(r["Total"] or 0)
+            present = int(r["Present"] or 0)
+            rate = f"{int(round((present / total) * 100))}%" if total else "0%"
+            yield {
+                "StudentID": r["StudentID"],
+                "Present": int(r["Present"] or 0),
+                "Late": int(r["Late"] or 0),
+                "Absent": int(r["Absent"] or 0),
+                "Excused": int(r["Excused"] or 0),
+                "AttendanceRate": rate,
+                "StudentName": r["fullname"],
+            }
+
+    def class_data_version(
+        self,
+        *,
+        class_name: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+    ) -> str:
+        """Signature of the class's sessions and records in range; any change to them changes it.
+
+        One indexed aggregate: session/record counts, latest record updatedAt and per-status
+        totals (the totals catch edits that land within the same updatedAt second).
+        """
+        where, params = _class_range_where(class_name, date_from, date_to)
+        row = self.db.query_one(
             f"""
-            SELECT st.StudentID, u.fullname,
-                   SUM(CASE WHEN ar.status='Present' THEN 1 ELSE 0 END) AS Present,
-                   SUM(CASE WHEN ar.status='Late' THEN 1 ELSE 0 END) AS Late,
-                   SUM(CASE WHEN ar.status='Absent' THEN 1 ELSE 0 END) AS Absent,
-                   SUM(CASE WHEN ar.status='Excused' THEN 1 ELSE 0 END) AS Excused,
-                   COUNT(ar.RecordID) AS Total
-            FROM Student st
-            JOIN User u ON u.UserID = st.UserID
-            LEFT JOIN AttendanceRecord ar ON ar.StudentUserID = st.UserID
-            LEFT JOIN AttendanceSession s ON s.SessionID = ar.SessionID
+            SELECT COUNT(DISTINCT s.SessionID), COUNT(ar.RecordID), MAX(ar.updatedAt),
+                   TOTAL(ar.status='Present'), TOTAL(ar.status='Late'),
+                   TOTAL(ar.status='Absent'), TOTAL(ar.status='Excused')
+            FROM AttendanceSession s
+            LEFT JOIN AttendanceRecord ar ON ar.SessionID = s.SessionID
             WHERE {' AND '.join(where)}
-            GROUP BY st.StudentID, u.fullname
-            ORDER BY u.fullname
             """,
             params,
         )
-        out = []
-        for r in rows:
-            total = int(r["Total"] or 0)
-            present = int(r["Present"] or 0)
-            rate = f"{int(round((present / total) * 100))}%" if total else "0%"
-            out.append(
-                {
-                    "StudentID": r["StudentID"],
-                    "Present": int(r["Present"] or 0),
-                    "Late": int(r["Late"] or 0),
-                    "Absent": int(r["Absent"] or 0),
-                    "Excused": int(r["Excused"] or 0),
-                    "AttendanceRate": rate,
-                    "StudentName": r["fullname"],
-                }
-            )
-        return out
+        return "|".join("" if v is None else str(v) for v in tuple(row))
+
+    def iter_session_details(
+        self,
+        *,
+        class_name: str,
+        date_from: Optional[str],
+        date_to: Optional[str],
+        chunk_size: int = 500,
+    ) -> Iterator[tuple]:
+        """Every record of the class's sessions in range, ordered by session, as plain tuples."""
+        where, params = _class_range_where(class_name, date_from, date_to)
+        return self.db.query_iter(
+            f"""
+            SELECT s.SessionID, s.date, COALESCE(s.startTime, ''), st.StudentID, u.fullname,
+                   ar.status, COALESCE(ar.checkTime, ''), COALESCE(ar.note, '')
+            FROM AttendanceSession s
+            JOIN AttendanceRecord ar ON ar.SessionID = s.SessionID
+            JOIN Student st ON st.UserID = ar.StudentUserID
+            JOIN User u ON u.UserID = ar.StudentUserID
+            WHERE {' AND '.join(where)}
+            ORDER BY s.date, s.SessionID, st.StudentID
+            """,
+            params,
+            chunk_size=chunk_size,
+            row_factory="tuple",
+        )
+
+    def rebuild_attendance_counters(self, class_name: Optional[str] = None) -> int:
+        return AttendanceCounter.rebuild(self.db, class_name)
 
     def export_report_xlsx(
         self,
@@ -461,77 +716,270 @@ class AttendanceService:
         date_from: Optional[str],
         date_to: Optional[str],
         output_path: str,
+        include_sessions: bool = False,
+        track_memory: bool = False,
     ) -> tuple[bool, str]:
+        """Stream the report into a write-only workbook; memory stays flat whatever the row count.
+
+        include_sessions adds a "Session Details" sheet with one row per record. Timing, row
+        counts and (with track_memory) the tracemalloc peak are left in last_export_stats.
+        """
         try:
             from openpyxl import Workbook
         except Exception:
             return False, "Missing dependency: openpyxl (pip install openpyxl)"
 
-        summary = self.summarize_class(class_name=class_name, date_from=date_from, date_to=date_to)
-
-        wb = Workbook()
-        ws = wb.active
-        if ws is None:
-            ws = wb.create_sheet(title="Attendance Report")
-        else:
-            ws.title = "Attendance Report"
-
-        ws.append(["Course/Class ID", class_name])
-        ws.append(["From", date_from or ""])
-        ws.append(["To", date_to or ""])
-        ws.append([])
-        ws.append(["StudentID", "StudentName", "Present", "Late", "Absent", "Excused", "Attendance Rate"])
-
-        for r in summary:
-            ws.append(
-                [r["StudentID"], r["StudentName"], r["Present"], r["Late"], r["Absent"], r["Excused"], r["AttendanceRate"]]
-            )
-
+        out_dir = os.path.dirname(os.path.abspath(output_path))
+        if not os.path.isdir(out_dir):
+            # a write-only workbook only fails at save(), after all rows were streamed
+            return False, f"Export failed: directory not found: {out_dir}"
+
+        stats = ExportStats()
+        self.last_export_stats = stats
+        started = time.perf_counter()
+        # taken before streaming: anything written meanwhile is newer than the watermark
+        watermark, records = self._report_watermark(class_name, date_from, date_to)
+        tracing = track_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
         try:
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet(title=REPORT_SHEET)
+            ws.append(["Course/Class ID", class_name])
+            ws.append(["From", date_from or ""])
+            ws.append(["To", date_to or ""])
+            ws.append([])
+            ws.append(["StudentID", "StudentName", "Present", "Late", "Absent", "Excused", "Attendance Rate"])
+
+            for r in self.iter_class_summary(class_name=class_name, date_from=date_from, date_to=date_to):
+                ws.append(
+                    [r["StudentID"], r["StudentName"], r["Present"], r["Late"], r["Absent"], r["Excused"], r["AttendanceRate"]]
+                )
+                stats.summary_rows += 1
+
+            if include_sessions:
+                detail = wb.create_sheet(title=DETAIL_SHEET)
+                detail.append(["SessionID", "Date", "Start", "StudentID", "StudentName", "Status", "CheckTime", "Note"])
+                for row in self.iter_session_details(class_name=class_name, date_from=date_from, date_to=date_to):
+                    detail.append(list(row))
+                    stats.detail_rows += 1
+
+            meta = wb.create_sheet(title=META_SHEET)
+            meta.sheet_state = "hidden"
+            for key, value in (
+                ("format", 1),
+                ("className", class_name),
+                ("dateFrom", date_from or ""),
+                ("dateTo", date_to or ""),
+                ("includeSessions", int(include_sessions)),
+                ("watermark", watermark),
+                ("records", records),
+            ):
+                meta.append([key, value])
+
             wb.save(output_path)
         except Exception as e:
             return False, f"Export failed: {e}"
+        finally:
+            stats.seconds = round(time.perf_counter() - started, 3)
+            if tracing:
+                stats.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
         return True, "Export completed successfully."
 
-    def generate_warnings_for_all_students(self, *, class_name: str, threshold_absent: int = 3) -> None:
-        rows = self.db.query_all(
-            """
-            SELECT ar.StudentUserID, COUNT(*) AS AbsentCount
+    def _report_watermark(self, class_name: str, date_from: Optional[str], date_to: Optional[str]) -> tuple[str, int]:
+        """(watermark, record count) for a report; later updates apply records with updatedAt > watermark.
+
+        The watermark trails the clock by a couple of seconds so writes stamped just before the
+        export but committed after it are not skipped.
+        """
+        where, params = _class_range_where(class_name, date_from, date_to)
+        row = self.db.query_one(
+            f"""
+            SELECT COALESCE(MAX(ar.updatedAt), ''), COUNT(*)
             FROM AttendanceRecord ar
             JOIN AttendanceSession s ON s.SessionID = ar.SessionID
-            WHERE s.className=? AND ar.status='Absent'
-            GROUP BY ar.StudentUserID
-            HAVING COUNT(*) >= ?
+            WHERE {' AND '.join(where)}
             """,
-            (class_name, threshold_absent),
+            params,
         )
-        if not rows:
-            return
+        cutoff = (datetime.utcnow() - timedelta(seconds=2)).replace(microsecond=0).isoformat(sep=" ")
+        return min(row[0], cutoff), int(row[1])
 
-        gen = IdGenerator(self.db)
-        for r in rows:
-            student_uid = r["StudentUserID"]
-            existed = self.db.query_one(
-                """
-                SELECT 1 FROM Warning
-                WHERE StudentUserID=? AND className=? AND message LIKE ?
-                LIMIT 1
-                """,
-                (student_uid, class_name, f"%{threshold_absent}%"),
-            )
-            if existed:
-                continue
-            wid = gen.next_id("W", "Warning", "WarningID", width=3)
-            msg = f"Absence threshold reached ({threshold_absent})"
-            Warning(
-                warning_id=wid,
-                student_user_id=student_uid,
-                system_name="SAS",
+    def update_report_xlsx(
+        self,
+        *,
+        class_name: str,
+        date_from: Optional[str],
+        date_to: Optional[str],
+        output_path: str,
+        include_sessions: bool = False,
+    ) -> tuple[bool, str]:
+        """Bring an existing export up to date by applying only records changed since its watermark.
+
+        Summary rows are recomputed for the affected students only, detail rows are patched or
+        appended; appended rows are then sorted into the same order a full export writes. Falls back to a full export_report_xlsx() when there is no usable workbook,
+        its options differ, or the record count shows rows were deleted.
+        """
+
+        def rebuild(reason: str) -> tuple[bool, str]:
+            ok, msg = self.export_report_xlsx(
                 class_name=class_name,
-                message=msg,
-                created_at=utc_now_iso(),
-            ).save(self.db)
+                date_from=date_from,
+                date_to=date_to,
+                output_path=output_path,
+                include_sessions=include_sessions,
+            )
+            return ok, f"{msg} (full rebuild: {reason})" if ok else msg
 
+        try:
+            from openpyxl import load_workbook
+        except Exception:
+            return False, "Missing dependency: openpyxl (pip install openpyxl)"
+
+        if not os.path.isfile(output_path):
+            return rebuild("no existing report")
+        try:
+            wb = load_workbook(output_path)
+        except Exception:
+            return rebuild("existing report unreadable")
+        if META_SHEET not in wb.sheetnames or REPORT_SHEET not in wb.sheetnames:
+            return rebuild("existing report has no watermark")
+        meta = {str(k): ("" if v is None else v) for k, v, *_ in wb[META_SHEET].iter_rows(values_only=True)}
+        if (
+            str(meta.get("className")) != class_name
+            or str(meta.get("dateFrom")) != (date_from or "")
+            or str(meta.get("dateTo")) != (date_to or "")
+            or int(meta.get("includeSessions") or 0) != int(include_sessions)
+            or (include_sessions and DETAIL_SHEET not in wb.sheetnames)
+        ):
+            return rebuild("existing report was built for other options")
+
+        stats = ExportStats(incremental=True)
+        self.last_export_stats = stats
+        started = time.perf_counter()
+
+        new_watermark, records = self._report_watermark(class_name, date_from, date_to)
+        where, params = _class_range_where(class_name, date_from, date_to)
+        delta = self.db.query_all(
+            f"""
+            SELECT s.SessionID, s.date, COALESCE(s.startTime, ''), st.StudentID, u.fullname,
+                   ar.status, COALESCE(ar.checkTime, ''), COALESCE(ar.note, ''), ar.StudentUserID
+            FROM AttendanceRecord ar
+            JOIN AttendanceSession s ON s.SessionID = ar.SessionID
+            JOIN Student st ON st.UserID = ar.StudentUserID
+            JOIN User u ON u.UserID = ar.StudentUserID
+            WHERE {' AND '.join(where)} AND ar.updatedAt > ?
+            ORDER BY s.date, s.SessionID, st.StudentID
+            """,
+            [*params, str(meta.get("watermark") or "")],
+        )
+
+        ws = wb[REPORT_SHEET]
+        by_student = {
+            row[0].value: row[0].row
+            for row in ws.iter_rows(min_row=SUMMARY_FIRST_ROW, max_col=1)
+            if row[0].value is not None
+        }
+        affected = {r["StudentUserID"] for r in delta}
+        appended = False
+        if affected:
+            for r in self.iter_class_summary(
+                class_name=class_name, date_from=date_from, date_to=date_to, student_user_ids=affected
+            ):
+                values = [r["StudentID"], r["StudentName"], r["Present"], r["Late"], r["Absent"], r["Excused"], r["AttendanceRate"]]
+                at = by_student.get(r["StudentID"])
+                if at is None:
+                    ws.append(values)
+                    appended = True
+                else:
+                    for col, v in enumerate(values, 1):
+                        ws.cell(row=at, column=col, value=v)
+                stats.summary_rows += 1
+
+        total = sum(
+            int(v or 0)
+            for row in ws.iter_rows(min_row=SUMMARY_FIRST_ROW, min_col=3, max_col=6, values_only=True)
+            for v in row
+        )
+        if total != records:
+            return rebuild("records were deleted since the last export")
+        if appended:
+            # same order as iter_class_summary: name, then StudentID
+            _sort_sheet_rows(ws, SUMMARY_FIRST_ROW, key=lambda v: (str(v[1] or ""), str(v[0] or "")))
+
+        if include_sessions:
+            detail = wb[DETAIL_SHEET]
+            by_record = {
+                (row[0].value, row[3].value): row[0].row
+                for row in detail.iter_rows(min_row=2, max_col=4)
+                if row[0].value is not None
+            }
+            appended = False
+            for r in delta:
+                values = list(r)[:8]
+                at = by_record.get((r["SessionID"], r["StudentID"]))
+                if at is None:
+                    detail.append(values)
+                    appended = True
+                    by_record[(r["SessionID"], r["StudentID"])] = detail.max_row
+                else:
+                    for col, v in enumerate(values, 1):
+                        detail.cell(row=at, column=col, value=v)
+                stats.detail_rows += 1
+            if len(by_record) != records:
+                return rebuild("records were deleted since the last export")
+            if appended:
+                # same order as iter_session_details: date, SessionID, StudentID
+                _sort_sheet_rows(detail, 2, key=lambda v: (str(v[1] or ""), str(v[0] or ""), str(v[3] or "")))
+
+        meta_ws = wb[META_SHEET]
+        for row in meta_ws.iter_rows(max_col=2):
+            if row[0].value == "watermark":
+                row[1].value = new_watermark
+            elif row[0].value == "records":
+                row[1].value = records
+        try:
+            wb.save(output_path)
+        except Exception as e:
+            return False, f"Export failed: {e}"
+        stats.seconds = round(time.perf_counter() - started, 3)
+        return True, f"Report updated incrementally ({len(delta)} changed record(s))."
+
+    def generate_warnings_for_all_students(self, *, class_name: str, threshold_absent: Optional[int] = None) -> int:
+        """Re-evaluate the warning policy for every student of the class (maintenance path).
+
+        threshold_absent, when given, applies just the absolute-absence rule with that threshold.
+        """
+        policy = (
+            WarningPolicy([AbsoluteAbsences(threshold_absent)])
+            if threshold_absent is not None
+            else self.effective_warning_policy()
+        )
+        return policy.apply(self.db, class_name=class_name)
+
+    def _generate_warnings_for_session(self, session: AttendanceSession) -> int:
+        """Evaluate the students this session marked Absent or Late against their class counters.
+
+        Policies with a rate rule re-check every student recorded for the session (after the
+        absent backfill that is the whole roster), since attending can also move a rate.
+        """
+        policy = self.effective_warning_policy()
+        sql = "SELECT StudentUserID FROM AttendanceRecord WHERE SessionID=?"
+        if not policy.needs_all_students:
+            sql += " AND status IN ('Absent', 'Late')"
+        rows = self.db.query_all(sql, (session.session_id,))
+        if not rows:
+            return 0
+        return policy.apply(
+            self.db,
+            class_name=session.class_name,
+            student_user_ids=[r["StudentUserID"] for r in rows],
+            session_id=session.session_id,
+        )
+
+    def effective_warning_policy(self) -> WarningPolicy:
+        return self.warning_policy or load_warning_policy(self.db)
 
     def search_attendance_records(
         self,
@@ -541,6 +989,42 @@ class AttendanceService:
         date_from: Optional[str] = None,
         date_to: Optional[str] = None,
     ) -> list[dict]:
+        return list(self.iter_attendance_records(by=by, keyword=keyword, date_from=date_from, date_to=date_to))
+
+    def iter_attendance_records(
+        self,
+        *,
+        by: str,
+        keyword: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        chunk_size: int = 500,
+    ) -> Iterator[dict]:
+        """All matching records, newest first, fetched chunk_size rows at a time (for exports)."""
+        token: Optional[str] = None
+        while True:
+            rows, token = self.search_attendance_page(
+                by=by, keyword=keyword, date_from=date_from, date_to=date_to, page_size=chunk_size, after=token
+            )
+            yield from rows
+            if token is None:
+                return
+
+    def search_attendance_page(
+        self,
+        *,
+        by: str,
+        keyword: str,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        page_size: int = 50,
+        after: Optional[str] = None,
+    ) -> tuple[list[dict], Optional[str]]:
+        """One page of search results plus the token for the next page (None on the last page).
+
+        Keyset pagination on (date, checkTime, RecordID) descending, so each page costs the same
+        however deep the caller has paged.
+        """
         where = []
         params: list[object] = []
 
@@ -556,7 +1040,7 @@ class AttendanceService:
         elif by == "date_range":
             pass
         else:
-            return []
+            return [], None
 
         if date_from:
             where.append("s.date>=?")
@@ -564,6 +1048,12 @@ class AttendanceService:
         if date_to:
             where.append("s.date<=?")
             params.append(date_to)
+        if after:
+            key = _decode_page_token(after)
+            if key is None:
+                return [], None
+            where.append("(s.date, COALESCE(ar.checkTime, ''), ar.RecordID) < (?, ?, ?)")
+            params.extend(key)
 
         clause = ("WHERE " + " AND ".join(where)) if where else ("WHERE 1=1")
         rows = self.db.query_all(
@@ -575,10 +1065,16 @@ class AttendanceService:
             JOIN Student st ON st.UserID = ar.StudentUserID
             JOIN User u ON u.UserID = ar.StudentUserID
             {clause}
-            ORDER BY s.date DESC, ar.checkTime DESC
+            ORDER BY s.date DESC, COALESCE(ar.checkTime, '') DESC, ar.RecordID DESC
+            LIMIT ?
             """,
-            params,
+            [*params, page_size + 1],
         )
+        next_token = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            next_token = _encode_page_token((last["date"], last["checkTime"] or "", last["RecordID"]))
         return [
             {
                 "RecordID": r["RecordID"],
@@ -592,7 +1088,56 @@ class AttendanceService:
                 "Note": r["note"] or "",
             }
             for r in rows
-        ]
+        ], next_token
+
+    def session_ids_for(
+        self, *, class_name: Optional[str] = None, date_from: Optional[str] = None, date_to: Optional[str] = None
+    ) -> list[str]:
+        where: list[str] = []
+        params: list[object] = []
+        if class_name:
+            where.append("className=?")
+            params.append(class_name)
+        if date_from:
+            where.append("date>=?")
+            params.append(date_from)
+        if date_to:
+            where.append("date<=?")
+            params.append(date_to)
+        clause = ("WHERE " + " AND ".join(where)) if where else ""
+        rows = self.db.query_all(f"SELECT SessionID FROM AttendanceSession {clause} ORDER BY date, SessionID", params)
+        return [r["SessionID"] for r in rows]
+
+    def filter_students_by_sessions(
+        self,
+        *,
+        session_ids: list[str],
+        statuses: list[str],
+        mode: str = "all",
+    ) -> list[dict]:
+        """Students whose status is one of `statuses` in every (mode="all") or any session given.
+
+        Answered from the bitset index, e.g. "Absent in both S012 and S015" or "Present at every
+        session of the month", instead of self-joining AttendanceRecord.
+        """
+        sids = [self.normalize_session_id(x) for x in session_ids if x.strip()]
+        uids = BitsetIndex.for_db(self.db).students(sids, statuses, mode="any" if mode == "any" else "all")
+        if not uids:
+            return []
+        rows = self.db.query_all(
+            """
+            SELECT st.StudentID, u.fullname
+            FROM Student st
+            JOIN User u ON u.UserID = st.UserID
+            WHERE st.UserID IN (SELECT value FROM json_each(?))
+            ORDER BY st.StudentID
+            """,
+            (json.dumps(uids),),
+        )
+        return [{"StudentID": r["StudentID"], "StudentName": r["fullname"]} for r in rows]
+
+    def rebuild_bitset_index(self) -> int:
+        return BitsetIndex.for_db(self.db).rebuild()
 
     def delete_attendance_record(self, *, session_id: str, student_id: str) -> tuple[bool, str]:
         session_id = self.normalize_session_id(session_id)
@@ -610,4 +1155,5 @@ class AttendanceService:
             "DELETE FROM AttendanceRecord WHERE SessionID=? AND StudentUserID=?",
             (session_id, s["UserID"]),
         )
+        self._session_changed(session_id)
         return True, "Deleted."
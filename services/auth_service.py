@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import sqlite3
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Literal, Optional
 
-from Database.database import Database, verify_password
+from Database.database import Database, hash_password, needs_rehash, verify_password
+from models.admin import Administrator
+from models.lecturer import Lecturer
+from models.student import Student
 from models.user import User
+from services.login_limiter import LoginLimiter
+from services.password_pool import PasswordPool
+from services.principal_cache import PRINCIPAL_SQL, PrincipalCache, principal_from_row
+from services.token_service import TokenStore
 
 Role = Literal["student", "lecturer", "admin", "unknown"]
 
@@ -29,20 +38,61 @@ class AuthService:
     last_error: Optional[str] = None       
     locked_until: Optional[str] = None       
     remaining_seconds: Optional[int] = None  
+    pool: Optional[PasswordPool] = None
+    limiter: Optional[LoginLimiter] = None
 
     def login(self, username: str, password: str) -> Optional[User]:
         """
         - Nếu sai >= 5 lần liên tiếp => khóa 5 phút.
         - Nếu đang bị khóa => không cho login dù đúng password.
         """
+        row = self._begin_login(username)
+        if row is None:
+            return None
+        ok = verify_password(password, row["password"])
+        new_hash = hash_password(password) if ok and needs_rehash(row["password"]) else None
+        return self._finish_login(row, ok, new_hash)
+
+    async def login_async(self, username: str, password: str) -> Optional[User]:
+        """Same rules as login(), but the PBKDF2 check runs on the password process pool."""
+        row = self._begin_login(username)
+        if row is None:
+            return None
+        pool = self.pool or PasswordPool.shared()
+        ok = await pool.verify_async(password, row["password"])
+        new_hash = None
+        if ok and needs_rehash(row["password"]):
+            new_hash = await asyncio.wrap_future(pool.hash(password))
+        return self._finish_login(row, ok, new_hash)
+
+    def login_token(self, username: str, password: str) -> Optional[str]:
+        """login(), then issue an opaque token for later calls (None on failure, see last_error)."""
+        user = self.login(username, password)
+        return TokenStore.for_db(self.db).issue(user) if user else None
+
+    def authenticate(self, token: str) -> Optional[User]:
+        return TokenStore.for_db(self.db).validate(token)
+
+    def logout(self, token: str) -> None:
+        TokenStore.for_db(self.db).revoke(token)
+
+    @property
+    def _limiter(self) -> LoginLimiter:
+        return self.limiter or LoginLimiter.for_db(self.db)
+
+    def _begin_login(self, username: str) -> Optional[sqlite3.Row]:
         self.last_error = None
         self.locked_until = None
         self.remaining_seconds = None
 
-        row = self.db.query_one(
-            "SELECT UserID, password, failedAttempts, lockUntil FROM User WHERE username=?",
-            (username,),
-        )
+        blocked = self._limiter.check(username)
+        if blocked is not None:
+            lock_dt, self.remaining_seconds = blocked
+            self.last_error = "LOCKED"
+            self.locked_until = lock_dt.isoformat(sep=" ") if lock_dt else None
+            return None
+
+        row = self.db.query_one(PRINCIPAL_SQL + " WHERE u.username = ?", (username,))
         if not row:
             self.last_error = "INVALID"
             return None
@@ -54,49 +104,47 @@ class AuthService:
             if lock_dt is not None:
                 now = _utc_now()
                 if now < lock_dt:
+                    self._limiter.lock(username, lock_dt)
                     self.last_error = "LOCKED"
                     self.locked_until = lock_until_s
                     self.remaining_seconds = int((lock_dt - now).total_seconds())
                     return None
             else:
                 self.db.execute("UPDATE User SET lockUntil=NULL WHERE UserID=?", (user_id,))
+        return row
 
-        ok = verify_password(password, row["password"])
+    def _finish_login(self, row: sqlite3.Row, ok: bool, new_hash: Optional[str] = None) -> Optional[User]:
+        user_id = row["UserID"]
         if ok:
-            self.db.execute(
-                "UPDATE User SET failedAttempts=0, lockUntil=NULL WHERE UserID=?",
-                (user_id,),
-            )
-            return User.load_by_id(self.db, user_id)
-
-        # login sai
-        failed = int(row["failedAttempts"] or 0) + 1
-
-        if failed >= 5:
-            lock_dt = _utc_now() + timedelta(minutes=5)
-            lock_until_s = lock_dt.isoformat(sep=" ")
-            self.db.execute(
-                "UPDATE User SET failedAttempts=?, lockUntil=? WHERE UserID=?",
-                (failed, lock_until_s, user_id),
-            )
+            self._limiter.record_success(row["username"])
+            # new_hash: stored hash was below the current policy, upgrade it while we have the password
+            if new_hash or row["failedAttempts"] or row["lockUntil"]:
+                self.db.execute(
+                    "UPDATE User SET failedAttempts=0, lockUntil=NULL, password=COALESCE(?, password) WHERE UserID=?",
+                    (new_hash, user_id),
+                )
+            user = principal_from_row(row)
+            if new_hash:
+                user.password_hash = new_hash
+            return PrincipalCache.for_db(self.db).put(user)
+
+        # login sai: counted in memory, written back by the limiter (immediately once it locks)
+        _, lock_dt = self._limiter.record_failure(row["username"], user_id, int(row["failedAttempts"] or 0))
+        if lock_dt is not None:
             self.last_error = "LOCKED"
-            self.locked_until = lock_until_s
+            self.locked_until = lock_dt.isoformat(sep=" ")
             self.remaining_seconds = int((lock_dt - _utc_now()).total_seconds())
             return None
 
-        
-        self.db.execute(
-            "UPDATE User SET failedAttempts=? WHERE UserID=?",
-            (failed, user_id),
-        )
         self.last_error = "INVALID"
         return None
 
     def detect_role(self, user_id: str) -> Role:
-        if self.db.query_one("SELECT 1 FROM Student WHERE UserID=?", (user_id,)):
+        user = PrincipalCache.for_db(self.db).resolve(user_id)
+        if isinstance(user, Student):
             return "student"
-        if self.db.query_one("SELECT 1 FROM Lecturer WHERE UserID=?", (user_id,)):
+        if isinstance(user, Lecturer):
             return "lecturer"
-        if self.db.query_one("SELECT 1 FROM Administrator WHERE UserID=?", (user_id,)):
+        if isinstance(user, Administrator):
             return "admin"
         return "unknown"
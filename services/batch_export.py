@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+from Database.database import Database
+from services.report_service import ReportService
+
+# progress(done, total, class_name, ok)
+ProgressFn = Callable[[int, int, str, bool], None]
+
+MANIFEST_NAME = "export_manifest.json"
+
+_worker_db: Optional[Database] = None
+
+
+def _init_worker(db_path: str) -> None:
+    global _worker_db
+    _worker_db = Database(db_path, read_only=True)
+
+
+def _service():
+    from services.attendance_service import AttendanceService
+
+    assert _worker_db is not None
+    return AttendanceService(_worker_db)
+
+
+def _export_class(
+    class_name: str, date_from: Optional[str], date_to: Optional[str], output_path: str, include_sessions: bool
+) -> tuple[bool, str, int]:
+    svc = _service()
+    ok, msg = svc.export_report_xlsx(
+        class_name=class_name,
+        date_from=date_from,
+        date_to=date_to,
+        output_path=output_path,
+        include_sessions=include_sessions,
+    )
+    rows = svc.last_export_stats.summary_rows if svc.last_export_stats else 0
+    return ok, msg, rows
+
+
+def _summarize_class(class_name: str, date_from: Optional[str], date_to: Optional[str]) -> list[list]:
+    return [
+        [r["StudentID"], r["StudentName"], r["Present"], r["Late"], r["Absent"], r["Excused"], r["AttendanceRate"]]
+        for r in _service().iter_class_summary(class_name=class_name, date_from=date_from, date_to=date_to)
+    ]
+
+
+def safe_filename(class_name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", class_name).strip("_") or "class"
+
+
+def class_paths(output_dir: str, classes: Iterable[str]) -> dict[str, str]:
+    """Output workbook per class. Names that sanitize to the same file (compared case-insensitively,
+    as on Windows/macOS) all get a short hash of the real class name, so parallel exports never
+    overwrite each other."""
+    groups: dict[str, list[str]] = {}
+    for c in classes:
+        groups.setdefault(safe_filename(c).lower(), []).append(c)
+    paths = {}
+    for members in groups.values():
+        for c in members:
+            stem = safe_filename(c)
+            if len(members) > 1:
+                stem += "_" + hashlib.sha1(c.encode("utf-8")).hexdigest()[:8]
+            paths[c] = os.path.abspath(os.path.join(output_dir, f"{stem}_Attendance.xlsx"))
+    return paths
+
+
+def _sheet_title(class_name: str, used: set[str]) -> str:
+    base = re.sub(r"[\[\]:*?/\\]", "_", class_name)[:31] or "class"
+    title, n = base, 1
+    while title.lower() in used:
+        n += 1
+        suffix = f"~{n}"
+        title = base[: 31 - len(suffix)] + suffix
+    used.add(title.lower())
+    return title
+
+
+def lecturer_classes(db: Database, lecturer_user_id: str) -> list[str]:
+    rows = db.query_all(
+        "SELECT DISTINCT className FROM AttendanceSession WHERE LecturerUserID=? ORDER BY className",
+        (lecturer_user_id,),
+    )
+    return [r["className"] for r in rows]
+
+
+@dataclass
+class BatchExportResult:
+    exported: list[dict] = field(default_factory=list)
+    failed: list[dict] = field(default_factory=list)
+    manifest_path: Optional[str] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
+def batch_export(
+    db_path: str,
+    classes: Iterable[str],
+    *,
+    date_from: Optional[str],
+    date_to: Optional[str],
+    output_dir: str,
+    single_workbook: Optional[str] = None,
+    include_sessions: bool = False,
+    max_workers: Optional[int] = None,
+    progress: Optional[ProgressFn] = None,
+    use_cache: bool = True,
+) -> BatchExportResult:
+    """Export many classes in parallel worker processes over read-only connections.
+
+    Default: one workbook per class in output_dir. With single_workbook (a file name inside
+    output_dir), workers only compute summaries and this process writes one sheet per class.
+    Every run writes export_manifest.json listing exported and failed classes.
+    With use_cache, per-class workbooks whose data is unchanged since a recorded export are
+    reused (see ReportService) and only the affected classes are regenerated.
+    """
+    classes = list(dict.fromkeys(c for c in classes if c))
+    result = BatchExportResult()
+    started = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    total = len(classes)
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+        if single_workbook is None:
+            cache = ReportService(Database(db_path)) if use_cache else None
+            paths = class_paths(output_dir, classes)
+            fingerprints: dict[str, str] = {}
+            done = 0
+            futures = {}
+            for c in classes:
+                path = paths[c]
+                if cache is not None:
+                    fp = fingerprints[c] = cache.fingerprint(
+                        class_name=c, date_from=date_from, date_to=date_to, include_sessions=include_sessions
+                    )
+                    hit = cache.find_cached(class_name=c, fingerprint=fp)
+                    if hit is not None and cache.reuse(hit, path)[0]:
+                        result.exported.append({"class": c, "file": path, "cached": True})
+                        done += 1
+                        if progress:
+                            progress(done, total, c, True)
+                        continue
+                futures[pool.submit(_export_class, c, date_from, date_to, path, include_sessions)] = c
+
+            for fut in as_completed(futures):
+                c = futures[fut]
+                path = paths[c]
+                try:
+                    ok, msg, rows = fut.result()
+                except Exception as e:
+                    ok, msg, rows = False, f"Export failed: {e}", 0
+                if ok:
+                    result.exported.append({"class": c, "file": path, "rows": rows})
+                    if cache is not None:
+                        cache.record(
+                            class_name=c,
+                            date_from=date_from,
+                            date_to=date_to,
+                            file_name=path,
+                            fingerprint=fingerprints[c],
+                            include_sessions=include_sessions,
+                        )
+                else:
+                    result.failed.append({"class": c, "error": msg})
+                done += 1
+                if progress:
+                    progress(done, total, c, ok)
+            if cache is not None:
+                cache.db.close()
+        else:
+            summaries: dict[str, list[list]] = {}
+            futures = {pool.submit(_summarize_class, c, date_from, date_to): c for c in classes}
+            for done, fut in enumerate(as_completed(futures), 1):
+                c = futures[fut]
+                try:
+                    summaries[c] = fut.result()
+                    ok = True
+                except Exception as e:
+                    result.failed.append({"class": c, "error": str(e)})
+                    ok = False
+                if progress:
+                    progress(done, total, c, ok)
+            _write_single_workbook(
+                os.path.join(output_dir, single_workbook), classes, summaries, date_from, date_to, result
+            )
+
+    result.seconds = round(time.perf_counter() - started, 3)
+    result.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(result.manifest_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "dateFrom": date_from,
+                "dateTo": date_to,
+                "seconds": result.seconds,
+                "exported": result.exported,
+                "failed": result.failed,
+            },
+            f,
+            indent=2,
+        )
+    return result
+
+
+def _write_single_workbook(
+    path: str,
+    classes: list[str],
+    summaries: dict[str, list[list]],
+    date_from: Optional[str],
+    date_to: Optional[str],
+    result: BatchExportResult,
+) -> None:
+    try:
+        from openpyxl import Workbook
+    except Exception:
+        result.failed.extend({"class": c, "error": "Missing dependency: openpyxl (pip install openpyxl)"} for c in summaries)
+        return
+
+    wb = Workbook(write_only=True)
+    used: set[str] = set()
+    written = []
+    for c in classes:
+        if c not in summaries:
+            continue
+        ws = wb.create_sheet(title=_sheet_title(c, used))
+        ws.append(["Course/Class ID", c])
+        ws.append(["From", date_from or ""])
+        ws.append(["To", date_to or ""])
+        ws.append([])
+        ws.append(["StudentID", "StudentName", "Present", "Late", "Absent", "Excused", "Attendance Rate"])
+        for row in summaries[c]:
+            ws.append(row)
+        written.append({"class": c, "file": path, "sheet": ws.title, "rows": len(summaries[c])})
+    try:
+        wb.save(path)
+    except Exception as e:
+        result.failed.extend({"class": w["class"], "error": f"Export failed: {e}"} for w in written)
+        return
+    result.exported.extend(written)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Iterable, Literal, Optional
+
+from Database.database import Database
+from services._registry import PerDatabase
+
+STATUSES = ("Present", "Late", "Absent", "Excused")
+
+
+class BitsetIndex:
+    """Per-Database bitmap index: one Python-int bitset per (session, status).
+
+    Students get dense bit positions on first sight. Sessions are loaded lazily on first use,
+    reloaded when a service write path marks them dirty, and after max_age_s to pick up writes
+    from other processes. Set queries are then integer AND/OR plus int.bit_count().
+    """
+
+    _registry: "PerDatabase[BitsetIndex]" = PerDatabase()
+
+    def __init__(self, db: Database, *, max_age_s: float = 60.0) -> None:
+        self.db = db
+        self.max_age_s = max_age_s
+        self._positions: dict[str, int] = {}
+        self._user_ids: list[str] = []
+        self._bits: dict[str, dict[str, int]] = {}
+        self._loaded_at: dict[str, float] = {}
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: Database) -> "BitsetIndex":
+        return cls._registry.get_or_create(db, lambda: cls(db))
+
+    @classmethod
+    def peek(cls, db: Database) -> Optional["BitsetIndex"]:
+        """The index if one was built for db (write paths use this to avoid creating one)."""
+        return cls._registry.get(db)
+
+    # maintenance
+
+    def rebuild(self) -> int:
+        """Drop everything and index every session. Returns the number of sessions indexed."""
+        with self._lock:
+            self._positions.clear()
+            self._user_ids.clear()
+            self._bits.clear()
+            self._loaded_at.clear()
+            self._dirty.clear()
+        rows = self.db.query_all("SELECT SessionID FROM AttendanceSession")
+        self._load([r["SessionID"] for r in rows])
+        return len(rows)
+
+    def mark_dirty(self, session_id: str) -> None:
+        with self._lock:
+            if session_id in self._bits:
+                self._dirty.add(session_id)
+
+    def record(self, session_id: str, student_user_id: str, status: str) -> None:
+        """Apply a single status write in place (check-in path); unloaded sessions are ignored."""
+        with self._lock:
+            bits = self._bits.get(session_id)
+            if bits is None or status not in bits:
+                return
+            bit = 1 << self._position(student_user_id)
+            for s in bits:
+                bits[s] &= ~bit
+            bits[status] |= bit
+
+    def _position(self, user_id: str) -> int:
+        pos = self._positions.get(user_id)
+        if pos is None:
+            pos = self._positions[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+        return pos
+
+    def _load(self, session_ids: list[str]) -> None:
+        fresh: dict[str, dict[str, int]] = {sid: dict.fromkeys(STATUSES, 0) for sid in session_ids}
+        for i in range(0, len(session_ids), 500):
+            chunk = session_ids[i : i + 500]
+            rows = self.db.query_iter(
+                """
+                SELECT SessionID, StudentUserID, status FROM AttendanceRecord
+                WHERE SessionID IN (SELECT value FROM json_each(?))
+                """,
+                (json.dumps(chunk),),
+                chunk_size=5000,
+                row_factory="tuple",
+            )
+            with self._lock:
+                for sid, uid, status in rows:
+                    if status in fresh[sid]:
+                        fresh[sid][status] |= 1 << self._position(uid)
+        now = time.monotonic()
+        with self._lock:
+            self._bits.update(fresh)
+            for sid in session_ids:
+                self._loaded_at[sid] = now
+                self._dirty.discard(sid)
+
+    def _ensure(self, session_ids: Iterable[str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            stale = [
+                sid
+                for sid in dict.fromkeys(session_ids)
+                if sid not in self._bits or sid in self._dirty or now - self._loaded_at[sid] >= self.max_age_s
+            ]
+        if stale:
+            self._load(stale)
+
+    # queries
+
+    def bits(self, session_ids: Iterable[str], statuses: Iterable[str], *, mode: Literal["all", "any"] = "all") -> int:
+        """Students whose status is one of `statuses` in all (or any) of the sessions, as a bitset."""
+        session_ids = list(session_ids)
+        statuses = [s for s in statuses if s in STATUSES]
+        if not session_ids or not statuses:
+            return 0
+        self._ensure(session_ids)
+        with self._lock:
+            per_session = []
+            for sid in session_ids:
+                b = 0
+                for s in statuses:
+                    b |= self._bits[sid][s]
+                per_session.append(b)
+        out = per_session[0]
+        for b in per_session[1:]:
+            out = (out & b) if mode == "all" else (out | b)
+        return out
+
+    def count(self, session_ids: Iterable[str], statuses: Iterable[str], *, mode: Literal["all", "any"] = "all") -> int:
+        return self.bits(session_ids, statuses, mode=mode).bit_count()
+
+    def students(self, session_ids: Iterable[str], statuses: Iterable[str], *, mode: Literal["all", "any"] = "all") -> list[str]:
+        """StudentUserIDs matching bits(...)."""
+        return self.decode(self.bits(session_ids, statuses, mode=mode))
+
+    def decode(self, bits: int) -> list[str]:
+        out = []
+        with self._lock:
+            while bits:
+                low = bits & -bits
+                out.append(self._user_ids[low.bit_length() - 1])
+                bits ^= low
+        return out
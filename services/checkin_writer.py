@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Literal, Optional
+
+from Database.database import Database
+from models.attendanceRecord import AttendanceRecord
+from services._registry import PerDatabase
+
+CheckInOutcome = Literal["ok", "duplicate", "closed"]
+
+
+@dataclass
+class WriterStats:
+    submitted: int = 0
+    written: int = 0
+    duplicates: int = 0
+    rejected_closed: int = 0
+    batches: int = 0
+    max_batch: int = 0
+
+
+class CheckInWriter:
+    """Write-behind queue that group-commits check-ins.
+
+    A background thread drains the queue every flush_interval_ms or every batch_size records
+    and inserts the batch in one transaction. submit() returns a Future that resolves only
+    after that transaction commits, so callers that wait on it keep acknowledged durability.
+    """
+
+    _registry: "PerDatabase[CheckInWriter]" = PerDatabase()
+
+    def __init__(self, db: Database, *, flush_interval_ms: int = 2, batch_size: int = 256) -> None:
+        self.db = db
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.stats = WriterStats()
+        self._queue: "queue.Queue[Optional[tuple[AttendanceRecord, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        # guards _stopped together with the enqueue, so nothing lands behind the stop sentinel
+        self._submit_lock = threading.Lock()
+
+    @classmethod
+    def enable(cls, db: Database, **kwargs) -> "CheckInWriter":
+        def start() -> "CheckInWriter":
+            writer = cls(db, **kwargs)
+            writer.start()
+            return writer
+
+        return cls._registry.get_or_create(db, start)
+
+    @classmethod
+    def get(cls, db: Database) -> Optional["CheckInWriter"]:
+        return cls._registry.get(db)
+
+    @classmethod
+    def disable(cls, db: Database) -> None:
+        writer = cls._registry.pop(db)
+        if writer is not None:
+            writer.shutdown()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="checkin-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, record: AttendanceRecord) -> "Future[CheckInOutcome]":
+        fut: "Future[CheckInOutcome]" = Future()
+        with self._submit_lock:
+            if self._stopped:
+                fut.set_exception(RuntimeError("Check-in writer is shut down."))
+                return fut
+            self.stats.submitted += 1
+            self._queue.put((record, fut))
+        return fut
+
+    def shutdown(self) -> None:
+        """Stop accepting work, flush everything queued, and stop the thread."""
+        with self._submit_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                stop = False
+                while len(batch) < self.batch_size:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        nxt = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if nxt is None:
+                        stop = True
+                        break
+                    batch.append(nxt)
+                self._write_batch(batch)
+                if stop:
+                    break
+        finally:
+            # the sentinel is always last, so this only finds work if the loop died early
+            with self._submit_lock:
+                self._stopped = True
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[1].set_exception(RuntimeError("Check-in writer is shut down."))
+            self.db.close_thread_connection()
+
+    def _write_batch(self, batch: list[tuple[AttendanceRecord, Future]]) -> None:
+        results: list[CheckInOutcome | Exception] = []
+        try:
+            with self.db.transaction():
+                for record, _ in batch:
+                    # a failed statement rolls back only itself, not the batch transaction
+                    try:
+                        results.append("ok" if record.insert_if_session_open(self.db) else "closed")
+                    except sqlite3.IntegrityError as e:
+                        results.append("duplicate" if "UNIQUE" in str(e) else e)
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+
+        self.stats.batches += 1
+        self.stats.max_batch = max(self.stats.max_batch, len(batch))
+        for (_, fut), result in zip(batch, results):
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+                continue
+            if result == "ok":
+                self.stats.written += 1
+            elif result == "duplicate":
+                self.stats.duplicates += 1
+            else:
+                self.stats.rejected_closed += 1
+            fut.set_result(result)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Optional
+
+from Database.database import Database, HashPolicy, hash_password, set_hash_policy, utc_now_iso
+
+SETTING_KEY = "password_hash_policy"
+
+# never calibrate below these, however slow the host is
+MIN_PBKDF2_ITERATIONS = 100_000
+MIN_SCRYPT_N = 2**14
+
+
+def load_hash_policy(db: Database) -> Optional[HashPolicy]:
+    row = db.query_one("SELECT value FROM Setting WHERE key=?", (SETTING_KEY,))
+    if not row:
+        return None
+    try:
+        return HashPolicy(**json.loads(row["value"]))
+    except Exception:
+        return None
+
+
+def save_hash_policy(db: Database, policy: HashPolicy) -> None:
+    db.execute(
+        """
+        INSERT INTO Setting (key, value, updatedAt) VALUES (?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET value=excluded.value, updatedAt=excluded.updatedAt
+        """,
+        (SETTING_KEY, json.dumps(policy.__dict__), utc_now_iso()),
+    )
+
+
+def apply_saved_hash_policy(db: Database) -> HashPolicy:
+    """Make the stored policy (if any) the process-wide one used for new hashes."""
+    policy = load_hash_policy(db) or HashPolicy()
+    set_hash_policy(policy)
+    return policy
+
+
+def _time_ms(policy: HashPolicy, rounds: int = 3) -> float:
+    salt = os.urandom(16)
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        hash_password("calibration", salt=salt, policy=policy)
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+def calibrate_hash_policy(*, target_ms: float = 250.0, algo: str = "pbkdf2_sha256") -> HashPolicy:
+    """Benchmark this host and pick the cost whose verify time is closest to target_ms."""
+    if algo == "scrypt":
+        n = MIN_SCRYPT_N
+        # scrypt cost doubles with n; stop before the next step overshoots the target
+        while _time_ms(HashPolicy("scrypt", n=n * 2)) <= target_ms:
+            n *= 2
+        return HashPolicy("scrypt", n=n)
+    if algo != "pbkdf2_sha256":
+        raise ValueError(f"Unsupported password hash algorithm: {algo}")
+
+    probe = 50_000
+    per_iter = _time_ms(HashPolicy(iterations=probe)) / probe
+    iterations = int(target_ms / per_iter) // 1000 * 1000
+    return HashPolicy(iterations=max(MIN_PBKDF2_ITERATIONS, iterations))
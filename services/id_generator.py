@@ -1,27 +1,77 @@
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass
+from typing import ClassVar
 
 from Database.database import Database
+from Database.migrations import seed_sequence
 
 
 @dataclass
 class IdGenerator:
-   
+    """Allocates prefixed IDs (S001, R001, W001, ...) from the Sequence table.
+
+    Each reservation is one atomic UPDATE ... RETURNING, inside the caller's transaction when
+    there is one, so the ID commits or rolls back with the row that uses it. With block_size > 1
+    and no open transaction, a block of numbers is reserved once and handed out from memory.
+    """
 
     db: Database
+    block_size: int = 1
+
+    _blocks: ClassVar[dict[tuple[str, str], list[int]]] = {}
+    _blocks_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def discard_blocks(cls, db: Database) -> None:
+        """Forget pre-allocated blocks for db (after its Sequence rows were reset)."""
+        with cls._blocks_lock:
+            for block_key in [k for k in cls._blocks if k[0] == db.db_path]:
+                del cls._blocks[block_key]
 
     def next_id(self, prefix: str, table: str, column: str, *, width: int = 3) -> str:
-        row = self.db.query_one(
-            f"SELECT {column} AS id FROM {table} WHERE {column} LIKE ? ORDER BY {column} DESC LIMIT 1",
-            (f"{prefix}%",),
-        )
-        if not row or not row["id"]:
-            return f"{prefix}{'1'.zfill(width)}"
-        last = str(row["id"])
-        num = 0
-        try:
-            num = int(last.replace(prefix, ""))
-        except Exception:
-            num = 0
-        return f"{prefix}{str(num + 1).zfill(width)}"
+        return self.next_ids(prefix, table, column, 1, width=width)[0]
+
+    def next_ids(self, prefix: str, table: str, column: str, count: int, *, width: int = 3) -> list[str]:
+        if count <= 0:
+            return []
+        key = f"{table}.{column}:{prefix}"
+        if self.block_size > 1 and not self.db.in_transaction:
+            nums = self._from_block(key, prefix, table, column, count)
+        else:
+            last = self._reserve(key, prefix, table, column, count)
+            nums = list(range(last - count + 1, last + 1))
+        return [f"{prefix}{str(n).zfill(width)}" for n in nums]
+
+    def _from_block(self, key: str, prefix: str, table: str, column: str, count: int) -> list[int]:
+        block_key = (self.db.db_path, key)
+        out: list[int] = []
+        with self._blocks_lock:
+            while len(out) < count:
+                block = self._blocks.get(block_key)
+                if not block or block[0] > block[1]:
+                    size = max(self.block_size, count - len(out))
+                    last = self._reserve(key, prefix, table, column, size)
+                    block = [last - size + 1, last]
+                    self._blocks[block_key] = block
+                take = min(count - len(out), block[1] - block[0] + 1)
+                out.extend(range(block[0], block[0] + take))
+                block[0] += take
+        return out
+
+    def _reserve(self, key: str, prefix: str, table: str, column: str, count: int) -> int:
+        """Advance the sequence by count and return its new value (the last reserved number)."""
+        with self.db.transaction():
+            rows = self.db.query_all(
+                "UPDATE Sequence SET value = value + ? WHERE name=? RETURNING value",
+                (count, key),
+            )
+            if not rows:
+                # first use of this prefix: continue after the highest numeric ID already stored
+                seed_sequence(self.db, prefix, table, column)
+                rows = self.db.query_all(
+                    "UPDATE Sequence SET value = value + ? WHERE name=? RETURNING value",
+                    (count, key),
+                )
+        return int(rows[0]["value"])
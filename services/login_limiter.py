@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from Database.database import Database
+from services._registry import PerDatabase
+
+
+def _utc_now() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)
+
+
+@dataclass
+class _Entry:
+    user_id: Optional[str] = None
+    failures: int = 0
+    lock_until: Optional[datetime] = None
+    attempts: deque = field(default_factory=deque)
+    dirty: bool = False
+
+
+class LoginLimiter:
+    """Per-Database, in-process guard in front of the failedAttempts/lockUntil columns.
+
+    Locked usernames (and, with burst_limit set, usernames over burst_limit attempts in the
+    last burst_window_s seconds) are rejected without touching the database. Failure counts
+    stay in memory and are written back every flush_interval_s; a lock is written immediately
+    so other processes see it.
+    """
+
+    _registry: "PerDatabase[LoginLimiter]" = PerDatabase()
+
+    def __init__(
+        self,
+        db: Database,
+        *,
+        max_failures: int = 5,
+        lock_minutes: int = 5,
+        burst_limit: Optional[int] = None,
+        burst_window_s: float = 60.0,
+        flush_interval_s: Optional[float] = 30.0,
+        max_entries: int = 10_000,
+    ) -> None:
+        self.db = db
+        self.max_failures = max_failures
+        self.lock_minutes = lock_minutes
+        self.burst_limit = burst_limit
+        self.burst_window_s = burst_window_s
+        self.flush_interval_s = flush_interval_s
+        self.max_entries = max_entries
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    @classmethod
+    def for_db(cls, db: Database) -> "LoginLimiter":
+        return cls._registry.get_or_create(db, lambda: cls(db))
+
+    def check(self, username: str) -> Optional[tuple[Optional[datetime], int]]:
+        """Count an attempt; return (lock_until, remaining_seconds) if it must be rejected."""
+        now_m = time.monotonic()
+        with self._lock:
+            e = self._entries.get(username)
+            if e is not None and e.lock_until is not None:
+                remaining = int((e.lock_until - _utc_now()).total_seconds())
+                if remaining > 0:
+                    return e.lock_until, remaining
+                e.lock_until = None
+            if self.burst_limit is None:
+                return None
+            if e is None:
+                e = self._entry(username)
+            while e.attempts and now_m - e.attempts[0] >= self.burst_window_s:
+                e.attempts.popleft()
+            if len(e.attempts) >= self.burst_limit:
+                return None, max(1, int(self.burst_window_s - (now_m - e.attempts[0])))
+            e.attempts.append(now_m)
+            return None
+
+    def lock(self, username: str, lock_until: datetime) -> None:
+        """Remember a lock found in (or written to) the database."""
+        with self._lock:
+            self._entry(username).lock_until = lock_until
+
+    def record_failure(self, username: str, user_id: str, stored_failures: int) -> tuple[int, Optional[datetime]]:
+        """Count a wrong password; returns (consecutive failures, lock_until if this locked it)."""
+        with self._lock:
+            e = self._entry(username)
+            e.user_id = user_id
+            # the row may already carry failures from another process or an earlier run
+            e.failures = max(e.failures, stored_failures) + 1
+            if e.failures < self.max_failures:
+                e.dirty = True
+                failures, lock_until = e.failures, None
+            else:
+                e.lock_until = _utc_now() + timedelta(minutes=self.lock_minutes)
+                e.dirty = False
+                failures, lock_until = e.failures, e.lock_until
+        if lock_until is not None:
+            self.db.execute(
+                "UPDATE User SET failedAttempts=?, lockUntil=? WHERE UserID=?",
+                (failures, lock_until.isoformat(sep=" "), user_id),
+            )
+        elif self.flush_interval_s is not None and time.monotonic() - self._last_flush >= self.flush_interval_s:
+            self.flush()
+        return failures, lock_until
+
+    def record_success(self, username: str) -> None:
+        with self._lock:
+            e = self._entries.get(username)
+            if e is not None and not e.attempts:
+                del self._entries[username]
+            elif e is not None:
+                e.failures, e.lock_until, e.dirty = 0, None, False
+
+    def flush(self) -> int:
+        """Write pending failure counts to User.failedAttempts; returns rows written."""
+        with self._lock:
+            pending = [(e.failures, e.user_id) for e in self._entries.values() if e.dirty and e.user_id]
+            for e in self._entries.values():
+                e.dirty = False
+            self._last_flush = time.monotonic()
+        if pending:
+            self.db.executemany("UPDATE User SET failedAttempts=? WHERE UserID=?", pending)
+        return len(pending)
+
+    def _entry(self, username: str) -> _Entry:
+        e = self._entries.get(username)
+        if e is None:
+            if len(self._entries) >= self.max_entries:
+                self._prune()
+            e = self._entries[username] = _Entry()
+        return e
+
+    def _prune(self) -> None:
+        now = _utc_now()
+        for name in [
+            n for n, e in self._entries.items()
+            if not e.dirty and (e.lock_until is None or e.lock_until <= now)
+        ]:
+            del self._entries[name]
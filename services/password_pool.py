@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from Database.database import current_hash_policy, hash_password, verify_password
+
+
+@dataclass
+class HashPoolStats:
+    submitted: int = 0
+    completed: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    total_latency_ms: float = 0.0
+    max_latency_ms: float = 0.0
+
+    @property
+    def avg_latency_ms(self) -> float:
+        return self.total_latency_ms / self.completed if self.completed else 0.0
+
+
+class PasswordPool:
+    """Process pool for PBKDF2 work so password hashing scales with cores, not the GIL.
+
+    in_flight is the queue depth (submitted but not finished); latency is measured from submit
+    to result, so it includes time spent waiting for a free worker.
+    """
+
+    _shared: Optional["PasswordPool"] = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, *, max_workers: Optional[int] = None) -> None:
+        self.max_workers = max_workers
+        self.stats = HashPoolStats()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> "PasswordPool":
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                atexit.register(cls._shared.shutdown)
+            return cls._shared
+
+    @classmethod
+    def configure(cls, *, max_workers: Optional[int] = None) -> "PasswordPool":
+        """Replace the shared pool (e.g. to size it for the host) and return it."""
+        with cls._shared_lock:
+            old, cls._shared = cls._shared, cls(max_workers=max_workers)
+            atexit.register(cls._shared.shutdown)
+        if old is not None:
+            old.shutdown()
+        return cls._shared
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _submit(self, fn, *args, **kwargs) -> Future:
+        started = time.perf_counter()
+        with self._lock:
+            self.stats.submitted += 1
+            self.stats.in_flight += 1
+            self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        fut = self._pool().submit(fn, *args, **kwargs)
+
+        def _done(_: Future) -> None:
+            elapsed = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.stats.in_flight -= 1
+                self.stats.completed += 1
+                self.stats.total_latency_ms += elapsed
+                self.stats.max_latency_ms = max(self.stats.max_latency_ms, elapsed)
+
+        fut.add_done_callback(_done)
+        return fut
+
+    def verify(self, password: str, encoded: str) -> "Future[bool]":
+        return self._submit(verify_password, password, encoded)
+
+    def hash(self, password: str, **kwargs) -> "Future[str]":
+        # workers may not share this process's policy (spawn start method), so always pass it
+        if "iterations" not in kwargs:
+            kwargs.setdefault("policy", current_hash_policy())
+        return self._submit(hash_password, password, **kwargs)
+
+    async def verify_async(self, password: str, encoded: str) -> bool:
+        return await asyncio.wrap_future(self.verify(password, encoded))
+
+    def hash_many(self, passwords: Iterable[str], **kwargs) -> list[str]:
+        """Hash passwords in parallel for bulk provisioning; results keep the input order."""
+        futures = [self.hash(p, **kwargs) for p in passwords]
+        return [f.result() for f in futures]
+
+    def pool_stats(self) -> dict:
+        with self._lock:
+            s = self.stats
+            return {
+                "workers": self.max_workers,
+                "queue_depth": s.in_flight,
+                "max_queue_depth": s.max_in_flight,
+                "submitted": s.submitted,
+                "completed": s.completed,
+                "avg_latency_ms": round(s.avg_latency_ms, 2),
+                "max_latency_ms": round(s.max_latency_ms, 2),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Optional
+
+from Database.database import Database
+from models.admin import Administrator
+from models.lecturer import Lecturer
+from models.student import Student
+from models.user import User
+from services._registry import PerDatabase
+
+# user row plus every role's columns; the role is whichever join matched
+PRINCIPAL_SQL = """
+    SELECT u.*, s.StudentID, s.majorName, l.LecturerID, a.AdminID
+    FROM User u
+    LEFT JOIN Student s ON s.UserID = u.UserID
+    LEFT JOIN Lecturer l ON l.UserID = u.UserID
+    LEFT JOIN Administrator a ON a.UserID = u.UserID
+"""
+
+
+def principal_from_row(row) -> User:
+    """Build the most specific model for a PRINCIPAL_SQL row (same precedence as detect_role)."""
+    if row["StudentID"] is not None:
+        return Student.from_join_row(row)
+    if row["LecturerID"] is not None:
+        return Lecturer.from_join_row(row)
+    if row["AdminID"] is not None:
+        return Administrator.from_join_row(row)
+    return User.from_row(row)
+
+
+class PrincipalCache:
+    """Per-Database TTL cache of resolved principals (Student/Lecturer/Administrator/User) by UserID."""
+
+    _registry: "PerDatabase[PrincipalCache]" = PerDatabase()
+
+    def __init__(self, db: Database, *, ttl_seconds: float = 300.0, max_entries: int = 4096) -> None:
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: dict[str, tuple[User, float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: Database) -> "PrincipalCache":
+        return cls._registry.get_or_create(db, lambda: cls(db))
+
+    def resolve(self, user_id: str) -> Optional[User]:
+        with self._lock:
+            hit = self._entries.get(user_id)
+        if hit is not None and time.monotonic() - hit[1] < self.ttl_seconds:
+            return hit[0]
+        row = self.db.query_one(PRINCIPAL_SQL + " WHERE u.UserID = ?", (user_id,))
+        if not row:
+            self.invalidate(user_id)
+            return None
+        return self.put(principal_from_row(row))
+
+    def put(self, user: User) -> User:
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[user.user_id] = (user, time.monotonic())
+        return user
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
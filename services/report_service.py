@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from typing import Optional
+
+from Database.database import Database
+from models.attendanceReport import AttendanceReport
+from services.attendance_service import AttendanceService, ExportStats
+
+
+def report_fingerprint(
+    class_name: str, date_from: Optional[str], date_to: Optional[str], options: dict, data_version: str
+) -> str:
+    payload = json.dumps([class_name, date_from or "", date_to or "", options, data_version], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _file_stat(path: str) -> tuple[Optional[int], Optional[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+@dataclass
+class ReportService:
+    """Exports attendance reports and records each one in AttendanceReport with a fingerprint.
+
+    The fingerprint covers the class, range, export options and class_data_version(); asking
+    again for a report whose fingerprint matches a recorded export whose file is still the one
+    written (same size and mtime) reuses that file instead of recomputing it.
+    """
+
+    db: Database
+    last_cached: bool = False
+    last_report: Optional[AttendanceReport] = None
+    last_export_stats: Optional[ExportStats] = None
+
+    def fingerprint(
+        self,
+        *,
+        class_name: str,
+        date_from: Optional[str],
+        date_to: Optional[str],
+        include_sessions: bool = False,
+    ) -> str:
+        version = AttendanceService(self.db).class_data_version(
+            class_name=class_name, date_from=date_from, date_to=date_to
+        )
+        return report_fingerprint(class_name, date_from, date_to, {"include_sessions": include_sessions}, version)
+
+    def find_cached(self, *, class_name: str, fingerprint: str) -> Optional[AttendanceReport]:
+        for report in AttendanceReport.find_by_fingerprint(self.db, class_name, fingerprint):
+            if not report.file_name or report.file_size is None:
+                continue
+            if _file_stat(report.file_name) == (report.file_size, report.file_mtime_ns):
+                return report
+        return None
+
+    def get_or_export(
+        self,
+        *,
+        class_name: str,
+        date_from: Optional[str],
+        date_to: Optional[str],
+        output_path: str,
+        include_sessions: bool = False,
+        lecturer_user_id: Optional[str] = None,
+        admin_user_id: Optional[str] = None,
+        incremental: bool = False,
+    ) -> tuple[bool, str]:
+        """incremental: on a cache miss, patch the workbook already at output_path with only the
+        changed records (AttendanceService.update_report_xlsx) instead of rebuilding it."""
+        self.last_cached = False
+        self.last_report = None
+        self.last_export_stats = None
+        # fingerprint first: changes landing during the export make the next request regenerate
+        fp = self.fingerprint(
+            class_name=class_name, date_from=date_from, date_to=date_to, include_sessions=include_sessions
+        )
+        out = os.path.abspath(output_path)
+
+        cached = self.find_cached(class_name=class_name, fingerprint=fp)
+        if cached is not None:
+            ok, msg = self.reuse(cached, out)
+            if ok:
+                self.last_cached = True
+                self.last_report = cached
+            return ok, msg
+
+        service = AttendanceService(self.db)
+        export = service.update_report_xlsx if incremental else service.export_report_xlsx
+        ok, msg = export(
+            class_name=class_name,
+            date_from=date_from,
+            date_to=date_to,
+            output_path=out,
+            include_sessions=include_sessions,
+        )
+        self.last_export_stats = service.last_export_stats
+        if ok:
+            self.last_report = self.record(
+                class_name=class_name,
+                date_from=date_from,
+                date_to=date_to,
+                file_name=out,
+                fingerprint=fp,
+                include_sessions=include_sessions,
+                lecturer_user_id=lecturer_user_id,
+                admin_user_id=admin_user_id,
+            )
+        return ok, msg
+
+    def reuse(self, cached: AttendanceReport, output_path: str) -> tuple[bool, str]:
+        """Serve a cached export at output_path (copying it there if it lives elsewhere)."""
+        src = os.path.abspath(cached.file_name or "")
+        if src == os.path.abspath(output_path):
+            return True, "Report unchanged since last export; reused cached file."
+        try:
+            shutil.copyfile(src, output_path)
+        except OSError as e:
+            return False, f"Export failed: {e}"
+        return True, f"Report unchanged since last export; copied from {src}."
+
+    def record(
+        self,
+        *,
+        class_name: str,
+        date_from: Optional[str],
+        date_to: Optional[str],
+        file_name: str,
+        fingerprint: str,
+        include_sessions: bool = False,
+        lecturer_user_id: Optional[str] = None,
+        admin_user_id: Optional[str] = None,
+    ) -> AttendanceReport:
+        # whatever was recorded at this path before has just been overwritten
+        self.db.execute(
+            "UPDATE AttendanceReport SET fingerprint=NULL WHERE fileName=? AND fingerprint IS NOT NULL",
+            (file_name,),
+        )
+        file_size, file_mtime_ns = _file_stat(file_name)
+        report = AttendanceReport.create(
+            title=f"Attendance Report {class_name}",
+            file_name=file_name,
+            managed_by_admin_user_id=admin_user_id,
+            summarized_by_lecturer_user_id=lecturer_user_id,
+            class_name=class_name,
+            date_from=date_from,
+            date_to=date_to,
+            options=json.dumps({"include_sessions": include_sessions}),
+            fingerprint=fingerprint,
+            file_size=file_size,
+            file_mtime_ns=file_mtime_ns,
+        )
+        report.save(self.db)
+        return report
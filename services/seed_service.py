@@ -9,6 +9,9 @@ from models.lecturer import Lecturer
 from models.student import Student
 from models.system import System
 from models.user import User
+from services.id_generator import IdGenerator
+from services.password_pool import PasswordPool
+from services.principal_cache import PrincipalCache
 
 
 class _DemoUser(TypedDict):
@@ -24,6 +27,7 @@ class _DemoUser(TypedDict):
 @dataclass
 class SeedService:
     db: Database
+    pool: Optional[PasswordPool] = None
 
 
     DEMO_USERS: list[_DemoUser] = None  # type: ignore[assignment]
@@ -93,8 +97,15 @@ class SeedService:
         if reset:
             self._reset_all_data()
 
-        for u in self.DEMO_USERS:
-            self._upsert_user(u)
+        # bulk provisioning: hash every password up front on the process pool when one is given
+        hashes: list[Optional[str]] = [None] * len(self.DEMO_USERS)
+        if self.pool is not None:
+            hashes = list(self.pool.hash_many(u["password"] for u in self.DEMO_USERS))
+
+        for u, password_hash in zip(self.DEMO_USERS, hashes):
+            self._upsert_user(u, password_hash)
+
+        PrincipalCache.for_db(self.db).invalidate()
 
         return True
 
@@ -103,7 +114,7 @@ class SeedService:
         return [(u["username"], u["password"]) for u in self.DEMO_USERS]
 
    
-    def _upsert_user(self, info: _DemoUser) -> None:
+    def _upsert_user(self, info: _DemoUser, password_hash: Optional[str] = None) -> None:
         existing = User.load_by_username(self.db, info["username"])
         user_id = existing.user_id if existing else None
 
@@ -116,6 +127,7 @@ class SeedService:
                 password=info["password"],
                 email=info["email"],
                 user_id=user_id,
+                password_hash=password_hash,
             )
             admin.admin_id = info["role_id"]
             admin.save(self.db)
@@ -128,6 +140,7 @@ class SeedService:
                 password=info["password"],
                 email=info["email"],
                 user_id=user_id,
+                password_hash=password_hash,
             )
             lec.lecturer_id = info["role_id"]
             lec.save(self.db)
@@ -140,6 +153,7 @@ class SeedService:
                 password=info["password"],
                 email=info["email"],
                 user_id=user_id,
+                password_hash=password_hash,
             )
             stu.student_id = info["role_id"]
             stu.major_name = info["major_name"]
@@ -153,15 +167,21 @@ class SeedService:
       
         for table in [
             "AttendanceRecord",
+            "AttendanceCounter",
+            "Enrollment",
             "LeaveRequest",
             "Warning",
             "AttendanceSession",
+            "AuthToken",
             "Student",
             "Lecturer",
             "Administrator",
             "User",
+            "Sequence",
         ]:
             try:
                 self.db.execute(f"DELETE FROM {table}")
             except Exception:
                 pass
+        # sequences reseed from the emptied tables on next use, so IDs restart at 001
+        IdGenerator.discard_blocks(self.db)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+from Database.database import Database
+from models.attendanceSession import AttendanceSession
+from services._registry import PerDatabase
+
+
+def session_expiry(session: AttendanceSession) -> Optional[datetime]:
+    if not (session.start_time and session.duration_minutes):
+        return None
+    try:
+        start = datetime.strptime(f"{session.date} {session.start_time}", "%Y-%m-%d %H:%M")
+        return start + timedelta(minutes=int(session.duration_minutes))
+    except Exception:
+        return None
+
+
+@dataclass
+class CachedSession:
+    session_id: str
+    status: str
+    expires_at: Optional[datetime]
+    require_pin: bool
+    pin: Optional[str]
+    loaded_at: float
+    checked_in: set[str] = field(default_factory=set)
+
+    def is_open(self, now: Optional[datetime] = None) -> bool:
+        if self.status != "OPEN":
+            return False
+        if self.expires_at is not None and (now or datetime.now()) > self.expires_at:
+            return False
+        return True
+
+
+class OpenSessionCache:
+    """Per-Database cache of session check-in state for the student_check_in hot path.
+
+    Entries hold the precomputed expiry, the PIN and the set of students already checked in.
+    Service write paths invalidate entries; the TTL bounds staleness against other processes.
+    """
+
+    _registry: "PerDatabase[OpenSessionCache]" = PerDatabase()
+
+    def __init__(self, db: Database, *, ttl_seconds: float = 30.0) -> None:
+        self.db = db
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[str, CachedSession] = {}
+        self._missing: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: Database) -> "OpenSessionCache":
+        return cls._registry.get_or_create(db, lambda: cls(db))
+
+    def get(self, session_id: str) -> Optional[CachedSession]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and now - entry.loaded_at < self.ttl_seconds:
+                return entry
+            missing_at = self._missing.get(session_id)
+            if missing_at is not None and now - missing_at < self.ttl_seconds:
+                return None
+        return self._load(session_id)
+
+    def _load(self, session_id: str) -> Optional[CachedSession]:
+        session = AttendanceSession.load_by_id(self.db, session_id)
+        now = time.monotonic()
+        if session is None:
+            with self._lock:
+                self._entries.pop(session_id, None)
+                self._missing[session_id] = now
+            return None
+
+        checked_in: set[str] = set()
+        if session.status == "OPEN":
+            rows = self.db.query_all(
+                "SELECT StudentUserID FROM AttendanceRecord WHERE SessionID=?", (session_id,)
+            )
+            checked_in = {r["StudentUserID"] for r in rows}
+        entry = CachedSession(
+            session_id=session.session_id,
+            status=session.status,
+            expires_at=session_expiry(session),
+            require_pin=session.require_pin,
+            pin=session.pin,
+            loaded_at=now,
+            checked_in=checked_in,
+        )
+        with self._lock:
+            self._missing.pop(session_id, None)
+            self._entries[session_id] = entry
+        return entry
+
+    def claim(self, session_id: str, student_user_id: str) -> bool:
+        """Reserve a check-in slot; False if the student is already recorded for the session."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return True
+            if student_user_id in entry.checked_in:
+                return False
+            entry.checked_in.add(student_user_id)
+            return True
+
+    def release(self, session_id: str, student_user_id: str) -> None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.checked_in.discard(student_user_id)
+
+    def invalidate(self, session_id: Optional[str] = None) -> None:
+        with self._lock:
+            if session_id is None:
+                self._entries.clear()
+                self._missing.clear()
+            else:
+                self._entries.pop(session_id, None)
+                self._missing.pop(session_id, None)
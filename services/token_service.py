@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import hashlib
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+from Database.database import Database, utc_now_iso
+from models.user import User
+from services._registry import PerDatabase
+from services.principal_cache import PrincipalCache
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _utc_now() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)
+
+
+@dataclass
+class _TokenEntry:
+    user: User
+    expires_at: datetime
+    checked_at: float
+
+
+class TokenStore:
+    """Opaque login tokens: an in-memory map in front of the AuthToken table.
+
+    validate() is a dict lookup on a hit; a miss (e.g. a token issued by another process) costs
+    one query. Hits are re-checked against the table every recheck_seconds so a revoke from
+    another process takes effect within that bound.
+    """
+
+    _registry: "PerDatabase[TokenStore]" = PerDatabase()
+
+    def __init__(self, db: Database, *, ttl_minutes: int = 8 * 60, recheck_seconds: float = 60.0) -> None:
+        self.db = db
+        self.ttl_minutes = ttl_minutes
+        self.recheck_seconds = recheck_seconds
+        self._entries: dict[str, _TokenEntry] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_db(cls, db: Database) -> "TokenStore":
+        return cls._registry.get_or_create(db, lambda: cls(db))
+
+    def issue(self, user: User, *, ttl_minutes: Optional[int] = None) -> str:
+        token = secrets.token_urlsafe(32)
+        expires_at = _utc_now() + timedelta(minutes=ttl_minutes or self.ttl_minutes)
+        self.db.execute(
+            "INSERT INTO AuthToken (TokenHash, UserID, createdAt, expiresAt) VALUES (?, ?, ?, ?)",
+            (_token_hash(token), user.user_id, utc_now_iso(), expires_at.isoformat(sep=" ")),
+        )
+        if type(user) is User:
+            # validate() hands out this object for routing, so store the role-specific principal
+            user = PrincipalCache.for_db(self.db).resolve(user.user_id) or user
+        with self._lock:
+            self._entries[_token_hash(token)] = _TokenEntry(user, expires_at, time.monotonic())
+        return token
+
+    def validate(self, token: str) -> Optional[User]:
+        key = _token_hash(token)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            if _utc_now() >= entry.expires_at:
+                self.revoke(token)
+                return None
+            if time.monotonic() - entry.checked_at < self.recheck_seconds:
+                return entry.user
+
+        row = self.db.query_one(
+            "SELECT UserID, expiresAt FROM AuthToken WHERE TokenHash=? AND expiresAt > ?",
+            (key, utc_now_iso()),
+        )
+        user = PrincipalCache.for_db(self.db).resolve(row["UserID"]) if row else None
+        with self._lock:
+            if user is None:
+                self._entries.pop(key, None)
+                return None
+            self._entries[key] = _TokenEntry(user, datetime.fromisoformat(row["expiresAt"]), time.monotonic())
+        return user
+
+    def revoke(self, token: str) -> None:
+        key = _token_hash(token)
+        with self._lock:
+            self._entries.pop(key, None)
+        self.db.execute("DELETE FROM AuthToken WHERE TokenHash=?", (key,))
+
+    def revoke_user(self, user_id: str) -> None:
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.user.user_id == user_id]:
+                del self._entries[key]
+        self.db.execute("DELETE FROM AuthToken WHERE UserID=?", (user_id,))
+
+    def purge_expired(self) -> int:
+        now = _utc_now()
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e.expires_at <= now]:
+                del self._entries[key]
+        with self.db.transaction():
+            rows = self.db.query_all(
+                "DELETE FROM AuthToken WHERE expiresAt <= ? RETURNING TokenHash",
+                (now.isoformat(sep=" "),),
+            )
+        return len(rows)
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Any, ClassVar, Optional
+
+from Database.database import Database, utc_now_iso
+from models.system import System
+from services.analytics import STATUS_CODES, AttendanceAnalytics
+
+SETTING_KEY = "warning_policy"
+
+
+@dataclass
+class StudentCounters:
+    """One student's AttendanceCounter row in a class, as the warning rules see it."""
+
+    student_user_id: str
+    present: int
+    late: int
+    absent: int
+    excused: int
+    total: int
+    absence_streak: int = 0  # filled only when a rule needs the matrix
+
+
+@dataclass(frozen=True)
+class AbsoluteAbsences:
+    kind: ClassVar[str] = "absent"
+    needs_matrix: ClassVar[bool] = False
+    needs_all_students: ClassVar[bool] = False
+    threshold: int = 3
+
+    @property
+    def rule(self) -> str:
+        return f"absent>={self.threshold}"
+
+    @property
+    def message(self) -> str:
+        return f"Absence threshold reached ({self.threshold})"
+
+    def matches(self, c: StudentCounters) -> bool:
+        return c.absent >= self.threshold
+
+
+@dataclass(frozen=True)
+class AbsenceRate:
+    kind: ClassVar[str] = "absent_rate"
+    needs_matrix: ClassVar[bool] = False
+    # a rate can cross its threshold when a student attends (reaching min_sessions)
+    needs_all_students: ClassVar[bool] = True
+    max_rate: float = 0.2
+    min_sessions: int = 5
+
+    @property
+    def rule(self) -> str:
+        return f"absent_rate>={self.max_rate:g}"
+
+    @property
+    def message(self) -> str:
+        return f"Absence rate reached {self.max_rate:.0%}"
+
+    def matches(self, c: StudentCounters) -> bool:
+        # Excused sessions do not count against the student
+        counted = c.total - c.excused
+        return counted >= self.min_sessions and c.absent >= self.max_rate * counted
+
+
+@dataclass(frozen=True)
+class ConsecutiveAbsences:
+    kind: ClassVar[str] = "consecutive_absent"
+    needs_matrix: ClassVar[bool] = True
+    needs_all_students: ClassVar[bool] = False
+    count: int = 3
+
+    @property
+    def rule(self) -> str:
+        return f"consecutive_absent>={self.count}"
+
+    @property
+    def message(self) -> str:
+        return f"{self.count} consecutive absences"
+
+    def matches(self, c: StudentCounters) -> bool:
+        return c.absence_streak >= self.count
+
+
+@dataclass(frozen=True)
+class WeightedAbsences:
+    """Absences where each Late counts as late_weight of an absence."""
+
+    kind: ClassVar[str] = "weighted_absent"
+    needs_matrix: ClassVar[bool] = False
+    needs_all_students: ClassVar[bool] = False
+    threshold: float = 3
+    late_weight: float = 0.5
+
+    @property
+    def rule(self) -> str:
+        return f"weighted_absent>={self.threshold:g}@late={self.late_weight:g}"
+
+    @property
+    def message(self) -> str:
+        return f"Absence threshold reached ({self.threshold:g}, lates count {self.late_weight:g})"
+
+    def matches(self, c: StudentCounters) -> bool:
+        return c.absent + self.late_weight * c.late >= self.threshold
+
+
+RULE_TYPES = {cls.kind: cls for cls in (AbsoluteAbsences, AbsenceRate, ConsecutiveAbsences, WeightedAbsences)}
+
+
+@dataclass
+class WarningPolicy:
+    """The set of warning rules applied when a session closes.
+
+    All rules are evaluated together over one counters query, so adding rules adds comparisons,
+    not queries. Only streak rules need the (cached) attendance matrix, and with it numpy.
+    """
+
+    rules: list[Any] = field(default_factory=lambda: [AbsoluteAbsences(3)])
+
+    @classmethod
+    def from_json(cls, text: str) -> "WarningPolicy":
+        rules = []
+        for item in json.loads(text):
+            item = dict(item)
+            kind = item.pop("kind", None)
+            rule_cls = RULE_TYPES.get(kind)
+            if rule_cls is None:
+                raise ValueError(f"Unknown warning rule kind: {kind!r}")
+            rules.append(rule_cls(**item))
+        return cls(rules)
+
+    def to_json(self) -> str:
+        return json.dumps([{"kind": r.kind, **asdict(r)} for r in self.rules])
+
+    @property
+    def needs_matrix(self) -> bool:
+        return any(r.needs_matrix for r in self.rules)
+
+    @property
+    def needs_all_students(self) -> bool:
+        """True if closing a session must re-check every student in it, not just new absences."""
+        return any(r.needs_all_students for r in self.rules)
+
+    def load_counters(
+        self,
+        db: Database,
+        *,
+        class_name: str,
+        student_user_ids: Optional[list[str]] = None,
+        session_id: Optional[str] = None,
+    ) -> list[StudentCounters]:
+        sql = "SELECT StudentUserID, Present, Late, Absent, Excused, Total FROM AttendanceCounter WHERE className=?"
+        params: list[object] = [class_name]
+        if student_user_ids is not None:
+            sql += " AND StudentUserID IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(student_user_ids))
+        counters = [
+            StudentCounters(*row) for row in db.query_iter(sql, params, chunk_size=5000, row_factory="tuple")
+        ]
+        if counters and self.needs_matrix:
+            m = AttendanceAnalytics.for_db(db).matrix(class_name)
+            # the streak ending at the session being closed, not at the class's latest session
+            runs = m.trailing_run(STATUS_CODES["Absent"], through_session=session_id).tolist()
+            pos = {uid: i for i, uid in enumerate(m.student_user_ids)}
+            for c in counters:
+                i = pos.get(c.student_user_id)
+                if i is not None:
+                    c.absence_streak = runs[i]
+        return counters
+
+    def evaluate(
+        self,
+        db: Database,
+        *,
+        class_name: str,
+        student_user_ids: Optional[list[str]] = None,
+        session_id: Optional[str] = None,
+    ) -> list[tuple[str, str, str]]:
+        """(student_user_id, message, rule) for every rule newly breached by the given students.
+
+        session_id: the session being closed; streaks are measured up to it.
+        """
+        if not self.rules or student_user_ids == []:
+            return []
+        counters = self.load_counters(
+            db, class_name=class_name, student_user_ids=student_user_ids, session_id=session_id
+        )
+        hits = [(rule, [c.student_user_id for c in counters if rule.matches(c)]) for rule in self.rules]
+        hits = [(rule, uids) for rule, uids in hits if uids]
+        if not hits:
+            return []
+        raised = set(
+            db.query_iter(
+                """
+                SELECT StudentUserID, rule FROM Warning
+                WHERE className=? AND rule IN (SELECT value FROM json_each(?))
+                """,
+                (class_name, json.dumps([rule.rule for rule, _ in hits])),
+                row_factory="tuple",
+            )
+        )
+        return [
+            (uid, rule.message, rule.rule) for rule, uids in hits for uid in uids if (uid, rule.rule) not in raised
+        ]
+
+    def apply(
+        self,
+        db: Database,
+        *,
+        class_name: str,
+        student_user_ids: Optional[list[str]] = None,
+        session_id: Optional[str] = None,
+    ) -> int:
+        """Evaluate and write the resulting warnings in one transaction; returns the number written."""
+        with db.transaction():
+            items = self.evaluate(
+                db, class_name=class_name, student_user_ids=student_user_ids, session_id=session_id
+            )
+            return System("SAS").send_warnings(db, class_name=class_name, items=items)
+
+
+def load_warning_policy(db: Database) -> WarningPolicy:
+    row = db.query_one("SELECT value FROM Setting WHERE key=?", (SETTING_KEY,))
+    if not row:
+        return WarningPolicy()
+    try:
+        return WarningPolicy.from_json(row["value"])
+    except Exception:
+        return WarningPolicy()
+
+
+def save_warning_policy(db: Database, policy: WarningPolicy) -> None:
+    db.execute(
+        """
+        INSERT INTO Setting (key, value, updatedAt) VALUES (?, ?, ?)
+        ON CONFLICT(key) DO UPDATE SET value=excluded.value, updatedAt=excluded.updatedAt
+        """,
+        (SETTING_KEY, policy.to_json(), utc_now_iso()),
+    )
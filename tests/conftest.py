@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Database.database import Database  # noqa: E402
+from models.lecturer import Lecturer  # noqa: E402
+from models.student import Student  # noqa: E402
+from services.attendance_service import AttendanceService  # noqa: E402
+from services.checkin_writer import CheckInWriter  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / "sas.db"))
+    db.initialize()
+    yield db
+    CheckInWriter.disable(db)
+    db.close()
+
+
+@pytest.fixture
+def lecturer(db) -> str:
+    Lecturer(user_id="L1", full_name="Lecturer One", username="lec1", password_hash="x", lecturer_id="LEC001").save(db)
+    return "L1"
+
+
+@pytest.fixture
+def students(db) -> list[str]:
+    ids = []
+    for i in range(1, 4):
+        Student(
+            user_id=f"U{i}", full_name=f"Student {i}", username=f"stu{i}", password_hash="x", student_id=f"STU{i:03d}"
+        ).save(db)
+        ids.append(f"U{i}")
+    return ids
+
+
+@pytest.fixture
+def service(db) -> AttendanceService:
+    return AttendanceService(db)
+
+
+@pytest.fixture
+def open_session(service, lecturer):
+    """Factory for OPEN sessions far enough in the future never to expire during a test."""
+
+    def make(date: str = "2099-01-01", class_name: str = "C1"):
+        return service.create_session(
+            lecturer_user_id=lecturer,
+            class_name=class_name,
+            date=date,
+            start_time="07:00",
+            duration_minutes=90,
+            require_pin=False,
+            pin=None,
+        )
+
+    return make
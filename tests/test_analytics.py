@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pytest
+
+from services.analytics import STATUS_CODES, AttendanceAnalytics, AttendanceMatrix
+
+np = pytest.importorskip("numpy")
+
+A, P = STATUS_CODES["Absent"], STATUS_CODES["Present"]
+
+
+def _matrix(rows: list[list[int]]) -> AttendanceMatrix:
+    n = len(rows[0])
+    return AttendanceMatrix(
+        class_name="C1",
+        version="",
+        student_user_ids=[f"U{i}" for i in range(len(rows))],
+        student_ids=[f"STU{i:03d}" for i in range(len(rows))],
+        student_names=[""] * len(rows),
+        session_ids=[f"S{j}" for j in range(n)],
+        session_dates=[""] * n,
+        codes=np.array(rows, dtype=np.int8),
+    )
+
+
+def test_run_lengths_carry_across_sessions_without_a_record():
+    m = _matrix([[A, 0, A, P, A], [0, A, A, 0, 0]])
+    assert m.run_lengths(A).tolist() == [[1, 1, 2, 0, 1], [0, 1, 2, 2, 2]]
+    assert m.trailing_run(A).tolist() == [1, 2]
+    assert m.trailing_run(A, through_session="S2").tolist() == [2, 2]
+
+
+def test_open_session_does_not_hide_a_current_streak(db, service, lecturer, open_session, students):
+    for day in ("01", "02", "03"):
+        service.close_session(open_session(f"2099-01-{day}").session_id, lecturer)
+    open_session("2099-01-04")  # newest session: open, no records yet
+
+    analytics = AttendanceAnalytics.for_db(db)
+    stats = {s["StudentUserID"]: s for s in analytics.student_stats("C1")}
+    assert stats[students[0]]["CurrentAbsenceStreak"] == 3
+    assert stats[students[0]]["LongestAbsenceStreak"] == 3
+    assert {s["StudentUserID"] for s in analytics.at_risk("C1", streak=3)} == set(students)
+
+
+def test_load_ignores_records_of_sessions_created_mid_load(db, service, open_session, students, monkeypatch):
+    first = open_session("2099-01-01")
+    service.student_check_in(student_user_id=students[0], session_id=first.session_id, pin=None)
+    analytics = AttendanceAnalytics.for_db(db)
+    real_query_iter = db.query_iter
+    calls = []
+
+    def racing_query_iter(sql, *args, **kwargs):
+        calls.append(sql)
+        if len(calls) == 3:  # between the sessions/students reads and the records read
+            later = open_session("2099-01-02")
+            service.student_check_in(student_user_id=students[0], session_id=later.session_id, pin=None)
+        return real_query_iter(sql, *args, **kwargs)
+
+    monkeypatch.setattr(db, "query_iter", racing_query_iter)
+    m = analytics.matrix("C1")
+
+    assert m.session_ids == [first.session_id]
+    assert m.student_user_ids == [students[0]]
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import ui.student_ui
+from models.student import Student
+from models.user import User
+from services.auth_service import AuthService
+from services.token_service import TokenStore
+from ui.auth_router import AuthRouter
+
+
+def test_route_dispatches_on_the_cached_principal_without_queries(db, students, monkeypatch):
+    token = TokenStore.for_db(db).issue(User.load_by_id(db, students[0]))
+    seen = []
+
+    class FakeStudentUI:
+        def __init__(self, db, user):
+            seen.append(user)
+
+        def run(self):
+            pass
+
+    monkeypatch.setattr(ui.student_ui, "StudentUI", FakeStudentUI)
+    before = db.pool_stats()["statements"]
+    AuthRouter(db)._route(token)
+
+    assert db.pool_stats()["statements"] == before
+    assert len(seen) == 1 and isinstance(seen[0], Student)
+    assert isinstance(AuthService(db).authenticate(token), Student)
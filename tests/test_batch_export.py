@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import os
+
+from services.batch_export import batch_export, class_paths
+
+
+def test_class_paths_disambiguate_names_that_sanitize_alike(tmp_path):
+    paths = class_paths(str(tmp_path), ["CS 101", "CS/101", "cs_101", "Math"])
+
+    assert len(set(p.lower() for p in paths.values())) == 4
+    assert paths["Math"].endswith("Math_Attendance.xlsx")
+    # stable for a class regardless of the rest of the batch
+    assert class_paths(str(tmp_path), ["CS/101", "CS 101"])["CS/101"] == paths["CS/101"]
+
+
+def test_colliding_classes_export_to_separate_workbooks(db, open_session, students, tmp_path):
+    for name in ("CS 101", "CS/101"):
+        open_session(class_name=name)
+    out = tmp_path / "out"
+
+    result = batch_export(
+        db.db_path, ["CS 101", "CS/101"], date_from=None, date_to=None, output_dir=str(out), max_workers=2
+    )
+
+    assert result.ok and not result.failed
+    files = sorted(e["file"] for e in result.exported)
+    assert len(set(files)) == 2 and all(os.path.isfile(f) for f in files)
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+from models.attendanceRecord import AttendanceRecord
+from services.checkin_writer import CheckInWriter
+
+
+def _check_in(service, session, uid):
+    return service.student_check_in(student_user_id=uid, session_id=session.session_id, pin=None)
+
+
+def test_check_in_then_duplicate(service, open_session, students):
+    s = open_session()
+    assert _check_in(service, s, students[0]) == (True, "Check-in successful.")
+    ok, msg = _check_in(service, s, students[0])
+    assert not ok and "already recorded" in msg
+
+
+def test_busy_failure_releases_claim(service, open_session, students, monkeypatch):
+    s = open_session()
+
+    def busy(self, db):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(AttendanceRecord, "insert_if_session_open", busy)
+    ok, msg = _check_in(service, s, students[0])
+    assert not ok and "try again" in msg
+
+    monkeypatch.undo()
+    assert _check_in(service, s, students[0]) == (True, "Check-in successful.")
+
+
+def test_unexpected_error_releases_claim_and_propagates(service, open_session, students, monkeypatch):
+    s = open_session()
+
+    def boom(self, db):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(AttendanceRecord, "insert_if_session_open", boom)
+    with pytest.raises(ValueError):
+        _check_in(service, s, students[0])
+
+    monkeypatch.undo()
+    assert _check_in(service, s, students[0]) == (True, "Check-in successful.")
+
+
+def test_shut_down_writer_returns_result_and_releases_claim(db, service, open_session, students):
+    s = open_session()
+    writer = CheckInWriter.enable(db)
+    writer.shutdown()  # still registered, so the check-in goes to a stopped writer
+
+    ok, msg = _check_in(service, s, students[0])
+    assert not ok and "try again" in msg
+
+    CheckInWriter.disable(db)
+    assert _check_in(service, s, students[0]) == (True, "Check-in successful.")
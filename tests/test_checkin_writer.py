@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import wait
+
+import pytest
+
+from models.attendanceRecord import AttendanceRecord
+from services.checkin_writer import CheckInWriter
+
+
+def _record(session_id: str, uid: str) -> AttendanceRecord:
+    return AttendanceRecord.create(
+        session_id=session_id, student_user_id=uid, status="Present", check_time=None, note=None
+    )
+
+
+def test_shutdown_flushes_queued_check_ins(db, open_session, students):
+    s = open_session()
+    writer = CheckInWriter(db, flush_interval_ms=50)
+    writer.start()
+    futures = [writer.submit(_record(s.session_id, uid)) for uid in students]
+    futures.append(writer.submit(_record(s.session_id, students[0])))
+    writer.shutdown()
+
+    assert [f.result(timeout=0) for f in futures] == ["ok", "ok", "ok", "duplicate"]
+    row = db.query_one("SELECT COUNT(*) AS c FROM AttendanceRecord WHERE SessionID=?", (s.session_id,))
+    assert row["c"] == len(students)
+
+
+def test_submit_after_shutdown_fails_fast(db, open_session, students):
+    s = open_session()
+    writer = CheckInWriter(db)
+    writer.start()
+    writer.shutdown()
+
+    fut = writer.submit(_record(s.session_id, students[0]))
+    with pytest.raises(RuntimeError):
+        fut.result(timeout=0)
+
+
+def test_submit_racing_shutdown_never_hangs(db):
+    for _ in range(10):
+        writer = CheckInWriter(db)
+        writer.start()
+        futures = []
+        lock = threading.Lock()
+
+        def submit_many():
+            for i in range(200):
+                fut = writer.submit(_record("S999", f"X{i}"))
+                with lock:
+                    futures.append(fut)
+
+        threads = [threading.Thread(target=submit_many) for _ in range(4)]
+        for t in threads:
+            t.start()
+        writer.shutdown()
+        for t in threads:
+            t.join()
+
+        _, pending = wait(futures, timeout=5)
+        assert not pending
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from models.lecturer import Lecturer
+from services.id_generator import IdGenerator
+
+
+def test_multi_character_prefix_continues_after_numeric_max(db):
+    for n in (9, 10):
+        Lecturer(
+            user_id=f"L{n}", full_name="Lecturer", username=f"lec{n}", password_hash="x", lecturer_id=f"LEC{n:03d}"
+        ).save(db)
+
+    assert IdGenerator(db).next_id("LEC", "Lecturer", "LecturerID") == "LEC011"
+
+
+def test_ids_past_999_keep_counting(db, open_session):
+    db.execute("UPDATE Sequence SET value = 998 WHERE name = 'AttendanceSession.SessionID:S'")
+    assert [open_session().session_id for _ in range(3)] == ["S999", "S1000", "S1001"]
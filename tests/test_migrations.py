@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+from Database.database import Database
+from Database.migrations import LATEST_VERSION, MIGRATIONS
+
+
+def _database_at(path: str, version: int) -> Database:
+    db = Database(path)
+    with db.transaction():
+        for number, step in MIGRATIONS:
+            if number <= version:
+                step(db)
+        db.execute(f"PRAGMA user_version = {version};")
+    return db
+
+
+def test_m011_keeps_earliest_duplicate_and_dedupes_classless_warnings(tmp_path):
+    db = _database_at(str(tmp_path / "old.db"), 10)
+    db.execute("INSERT INTO User (UserID, fullname, password, username) VALUES ('U1', 'S', 'x', 's')")
+    db.execute("INSERT INTO Student (UserID, StudentID) VALUES ('U1', 'STU001')")
+    db.execute("INSERT INTO System (SystemName) VALUES ('SAS')")
+    # the m005 index let class-less duplicates through; inserted in ID order W999, W1000
+    for wid in ("W999", "W1000"):
+        db.execute(
+            "INSERT INTO Warning (WarningID, StudentUserID, systemName, className, message, createdAt, rule) "
+            "VALUES (?, 'U1', 'SAS', NULL, 'm', '2020-01-01', 'absent>=3')",
+            (wid,),
+        )
+
+    db.initialize()
+
+    assert db.schema_version() == LATEST_VERSION
+    rows = db.query_all("SELECT WarningID, rule FROM Warning ORDER BY rowid")
+    assert [(r["WarningID"], r["rule"]) for r in rows] == [("W999", "absent>=3"), ("W1000", None)]
+    db.close()
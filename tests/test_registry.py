@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import threading
+
+from Database.database import Database
+from services._registry import PerDatabase
+
+
+def test_one_instance_per_database_even_under_concurrent_first_use(tmp_path):
+    registry: PerDatabase[object] = PerDatabase()
+    db = Database(str(tmp_path / "a.db"))
+    built, got = [], []
+    start = threading.Barrier(8)
+
+    def factory():
+        built.append(object())
+        return built[-1]
+
+    def worker():
+        start.wait()
+        got.append(registry.get_or_create(db, factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(built) == 1 and all(g is built[0] for g in got)
+    assert registry.pop(db) is built[0] and registry.get(db) is None
+    db.close()
+
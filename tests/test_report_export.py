@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import pytest
+
+from models.student import Student
+from services.attendance_service import DETAIL_SHEET, REPORT_SHEET, SUMMARY_FIRST_ROW
+
+openpyxl = pytest.importorskip("openpyxl")
+
+
+def _rows(path) -> tuple[list, list]:
+    wb = openpyxl.load_workbook(path)
+    summary = list(wb[REPORT_SHEET].iter_rows(min_row=SUMMARY_FIRST_ROW, values_only=True))
+    detail = list(wb[DETAIL_SHEET].iter_rows(min_row=2, values_only=True))
+    return summary, detail
+
+
+def test_incremental_update_keeps_full_export_row_order(db, service, open_session, students, tmp_path):
+    first = open_session("2099-01-02")
+    for uid in students[1:]:
+        service.student_check_in(student_user_id=uid, session_id=first.session_id, pin=None)
+    options = dict(class_name="C1", date_from=None, date_to=None, include_sessions=True)
+    updated = str(tmp_path / "updated.xlsx")
+    assert service.export_report_xlsx(output_path=updated, **options)[0]
+
+    # a student whose name sorts first, in a session dated before the existing one
+    Student(user_id="U9", full_name="Aaron", username="stu9", password_hash="x", student_id="STU009").save(db)
+    earlier = open_session("2099-01-01")
+    for uid in ("U9", students[0]):
+        service.student_check_in(student_user_id=uid, session_id=earlier.session_id, pin=None)
+        service.student_check_in(student_user_id=uid, session_id=first.session_id, pin=None)
+
+    assert service.update_report_xlsx(output_path=updated, **options)[0]
+    fresh = str(tmp_path / "fresh.xlsx")
+    assert service.export_report_xlsx(output_path=fresh, **options)[0]
+
+    summary, detail = _rows(updated)
+    assert summary[0][1] == "Aaron"
+    assert (summary, detail) == _rows(fresh)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pytest
+
+from Database.database import Database
+
+
+def _put(db: Database, key: str) -> None:
+    db.execute("INSERT INTO Setting (key, value) VALUES (?, 'v')", (key,))
+
+
+def _keys(db: Database) -> set[str]:
+    return {r["key"] for r in db.query_all("SELECT key FROM Setting")}
+
+
+@pytest.fixture
+def other(db):
+    """A second Database on the same file, to see only what was committed."""
+    other = Database(db.db_path)
+    yield other
+    other.close()
+
+
+def test_transaction_commits_once_at_the_end(db, other):
+    with db.transaction():
+        _put(db, "a")
+        _put(db, "b")
+        assert db.in_transaction
+        assert _keys(other) == set()
+    assert not db.in_transaction
+    assert _keys(other) == {"a", "b"}
+
+
+def test_transaction_rolls_back_on_error(db, other):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            _put(db, "a")
+            raise RuntimeError("boom")
+    assert not db.in_transaction
+    assert _keys(db) == _keys(other) == set()
+
+
+def test_nested_failure_rolls_back_only_the_savepoint(db, other):
+    with db.transaction():
+        _put(db, "outer")
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                _put(db, "inner")
+                raise RuntimeError("boom")
+        _put(db, "after")
+    assert _keys(other) == {"outer", "after"}
+
+
+def test_deferred_mode_holds_writes_until_commit(db, other):
+    deferred = Database(db.db_path, autocommit=False)
+    try:
+        _put(deferred, "a")
+        with deferred.transaction():
+            _put(deferred, "b")
+        assert _keys(other) == set()
+        deferred.commit()
+        assert _keys(other) == {"a", "b"}
+
+        _put(deferred, "c")
+        deferred.rollback()
+        assert _keys(other) == {"a", "b"}
+    finally:
+        deferred.close()
+
+
+def test_deferred_mode_failed_block_keeps_earlier_pending_writes(db, other):
+    deferred = Database(db.db_path, autocommit=False)
+    try:
+        _put(deferred, "kept")
+        with pytest.raises(RuntimeError):
+            with deferred.transaction():
+                _put(deferred, "dropped")
+                raise RuntimeError("boom")
+        deferred.commit()
+        assert _keys(other) == {"kept"}
+    finally:
+        deferred.close()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import sys
+
+import pytest
+
+from services.analytics import STATUS_CODES, AttendanceMatrix
+from services.warning_policy import (
+    AbsenceRate,
+    AbsoluteAbsences,
+    ConsecutiveAbsences,
+    WarningPolicy,
+    WeightedAbsences,
+)
+
+
+def _rules_for(db, uid: str) -> set[str]:
+    return {r["rule"] for r in db.query_all("SELECT rule FROM Warning WHERE StudentUserID=?", (uid,))}
+
+
+def test_trailing_run_skips_unrecorded_sessions():
+    np = pytest.importorskip("numpy")
+    a, p = STATUS_CODES["Absent"], STATUS_CODES["Present"]
+    m = AttendanceMatrix(
+        class_name="C1",
+        version="",
+        student_user_ids=["U1", "U2"],
+        student_ids=["STU001", "STU002"],
+        student_names=["", ""],
+        session_ids=["S1", "S2", "S3", "S4"],
+        session_dates=[""] * 4,
+        codes=np.array([[p, a, 0, a], [a, a, p, 0]], dtype=np.int8),
+    )
+    assert m.trailing_run(a).tolist() == [2, 0]
+    assert m.trailing_run(a, through_session="S2").tolist() == [1, 2]
+
+
+def test_consecutive_absences_measured_at_the_closing_session(db, service, lecturer, open_session, students):
+    pytest.importorskip("numpy")
+    service.warning_policy = WarningPolicy([ConsecutiveAbsences(2)])
+    s1, s2 = open_session("2099-01-01"), open_session("2099-01-02")
+    open_session("2099-01-03")  # later session stays OPEN with no records
+    service.student_check_in(student_user_id=students[1], session_id=s2.session_id, pin=None)
+
+    service.close_session(s1.session_id, lecturer)
+    assert not _rules_for(db, students[0])
+    service.close_session(s2.session_id, lecturer)
+
+    assert _rules_for(db, students[0]) == {"consecutive_absent>=2"}
+    assert not _rules_for(db, students[1])
+
+
+def test_counter_rules_need_no_numpy(db, service, lecturer, open_session, students, monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    service.warning_policy = WarningPolicy([AbsoluteAbsences(2), WeightedAbsences(threshold=1.5, late_weight=0.5)])
+    s1, s2 = open_session("2099-01-01"), open_session("2099-01-02")
+    service.student_check_in(student_user_id=students[1], session_id=s2.session_id, pin=None)
+
+    assert service.close_session(s1.session_id, lecturer)
+    assert service.close_session(s2.session_id, lecturer)
+
+    assert _rules_for(db, students[0]) == {"absent>=2", "weighted_absent>=1.5@late=0.5"}
+    assert not _rules_for(db, students[1])
+    # re-running the policy does not repeat warnings
+    assert service.generate_warnings_for_all_students(class_name="C1") == 0
+
+
+def test_rate_rule_fires_when_attending_reaches_min_sessions(db, service, lecturer, open_session, students):
+    service.warning_policy = WarningPolicy([AbsenceRate(max_rate=0.5, min_sessions=5)])
+    for day in ("01", "02", "03", "04"):
+        service.close_session(open_session(f"2099-01-{day}").session_id, lecturer)
+    assert not _rules_for(db, students[0])
+
+    last = open_session("2099-01-05")
+    service.student_check_in(student_user_id=students[0], session_id=last.session_id, pin=None)
+    service.close_session(last.session_id, lecturer)
+
+    # counters (Present 1, Absent 4, Total 5): the close itself raises it, as the maintenance path would
+    assert _rules_for(db, students[0]) == {"absent_rate>=0.5"}
+    assert service.generate_warnings_for_all_students(class_name="C1") == 0
@@ -21,6 +21,7 @@ class AdminUI:
             print(DASH)
             print("1. Search Attendance")
             print("2. Manage Attendance")
+            print("3. Rebuild Session Index")
             print("0. Logout")
             print(DASH)
             choice = ConsoleIO.ask("Selection: ")
@@ -29,6 +30,9 @@ class AdminUI:
                 self.search_attendance(service)
             elif choice == "2":
                 self.manage_attendance(service)
+            elif choice == "3":
+                n = service.rebuild_bitset_index()
+                print(f"Session index rebuilt ({n} sessions).")
             elif choice == "0":
                 return
             else:
@@ -36,8 +40,11 @@ class AdminUI:
 
     def search_attendance(self, service: AttendanceService) -> None:
         ConsoleIO.screen("SEARCH ATTENDANCE")
-        print("Search by: 1. StudentID  2. SessionID  3. Course/Class  4. Date Range")
+        print("Search by: 1. StudentID  2. SessionID  3. Course/Class  4. Date Range  5. Multi-session filter")
         sel = ConsoleIO.ask("Selection: ")
+        if sel == "5":
+            self._multi_session_filter(service)
+            return
         by_map = {"1": "student_id", "2": "session_id", "3": "class_name", "4": "date_range"}
         by = by_map.get(sel)
         if not by:
@@ -52,15 +59,49 @@ class AdminUI:
             dr = ConsoleIO.ask_date_range()
             dr_start, dr_end = dr.start, dr.end
 
-        rows = service.search_attendance_records(by=by, keyword=keyword, date_from=dr_start, date_to=dr_end)
-        print(DASH)
-        if not rows:
-            print("(No matching records.)")
+        token = None
+        page = 1
+        while True:
+            rows, token = service.search_attendance_page(
+                by=by, keyword=keyword, date_from=dr_start, date_to=dr_end, page_size=40, after=token
+            )
+            print(DASH)
+            if not rows and page == 1:
+                print("(No matching records.)")
+                return
+            table_rows = []
+            for r in rows:
+                table_rows.append([r["SessionID"], r["Date"], r["ClassName"], r["StudentID"], r["Status"]])
+            Table(headers=["SessionID", "Date", "Course/Class", "StudentID", "Status"], rows=table_rows).render()
+            if token is None:
+                return
+            if ConsoleIO.ask(f"Page {page}. N = next page, Enter = stop: ", allow_blank=True).lower() != "n":
+                return
+            page += 1
+
+    def _multi_session_filter(self, service: AttendanceService) -> None:
+        raw = ConsoleIO.ask("Session IDs (comma-separated), blank to pick by Course/Class and dates: ", allow_blank=True)
+        if raw:
+            session_ids = raw.split(",")
+        else:
+            class_name = ConsoleIO.ask("Enter Course/Class ID: ")
+            dr = ConsoleIO.ask_date_range()
+            session_ids = service.session_ids_for(class_name=class_name, date_from=dr.start, date_to=dr.end)
+            if not session_ids:
+                print("(No sessions found.)")
+                return
+        print("Status: 1. Present  2. Late  3. Absent  4. Excused  (several: e.g. 1,2)")
+        mapping = {"1": "Present", "2": "Late", "3": "Absent", "4": "Excused"}
+        statuses = [mapping[x.strip()] for x in ConsoleIO.ask("Selection: ").split(",") if x.strip() in mapping]
+        if not statuses:
+            ConsoleIO.invalid_menu()
             return
-        table_rows = []
-        for r in rows[:80]:
-            table_rows.append([r["SessionID"], r["Date"], r["ClassName"], r["StudentID"], r["Status"]])
-        Table(headers=["SessionID", "Date", "Course/Class", "StudentID", "Status"], rows=table_rows).render()
+        mode = "any" if ConsoleIO.ask("Match 1. all sessions  2. any session: ") == "2" else "all"
+        rows = service.filter_students_by_sessions(session_ids=session_ids, statuses=statuses, mode=mode)
+        print(DASH)
+        print(f"{len(rows)} student(s) over {len(session_ids)} session(s).")
+        if rows:
+            Table(headers=["StudentID", "StudentName"], rows=[[r["StudentID"], r["StudentName"]] for r in rows]).render()
 
     def manage_attendance(self, service: AttendanceService) -> None:
         ConsoleIO.screen("MANAGE ATTENDANCE")
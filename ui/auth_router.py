@@ -25,15 +25,18 @@ class AuthRouter:
             sel = ConsoleIO.ask("Selection: ")
 
             if sel == "1":
-                user = self._login_flow()
-                if user:
-                    self._route(user)
+                token = self._login_flow()
+                if token:
+                    try:
+                        self._route(token)
+                    finally:
+                        AuthService(self.db).logout(token)
             elif sel == "2":
                 raise SystemExit(0)
             else:
                 ConsoleIO.invalid_menu()
 
-    def _login_flow(self) -> Optional[User]:
+    def _login_flow(self) -> Optional[str]:
         ConsoleIO.screen("LOGIN")
         auth = AuthService(self.db)
 
@@ -45,9 +48,9 @@ class AuthRouter:
             password = ConsoleIO.ask_password("Password: ")
             print("-" * 50)
 
-            user = auth.login(username, password)
-            if user:
-                return user
+            token = auth.login_token(username, password)
+            if token:
+                return token
 
             if auth.last_error == "LOCKED":
                 if auth.remaining_seconds is not None:
@@ -60,22 +63,22 @@ class AuthRouter:
             print("Username or password is incorrect.")
 
 
-    def _route(self, user: User) -> None:
-        role = AuthService(self.db).detect_role(user.user_id)
-        if role == "student":
-            s = Student.load_by_user_id(self.db, user.user_id)
+    def _route(self, token: str) -> None:
+        # the token resolves to the role-specific principal already; no second lookup
+        user = AuthService(self.db).authenticate(token)
+        if user is None:
+            return
+        if isinstance(user, Student):
             from ui.student_ui import StudentUI
-            StudentUI(self.db, s).run()  # type: ignore[arg-type]
+            StudentUI(self.db, user).run()
             return
-        if role == "lecturer":
-            l = Lecturer.load_by_user_id(self.db, user.user_id)
+        if isinstance(user, Lecturer):
             from ui.lecturer_ui import LecturerUI
-            LecturerUI(self.db, l).run()  # type: ignore[arg-type]
+            LecturerUI(self.db, user).run()
             return
-        if role == "admin":
-            a = Administrator.load_by_user_id(self.db, user.user_id)
+        if isinstance(user, Administrator):
             from ui.admin_ui import AdminUI
-            AdminUI(self.db, a).run()  # type: ignore[arg-type]
+            AdminUI(self.db, user).run()
             return
 
       
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import csv
+import os
 from dataclasses import dataclass
 
 from Database.database import Database
 from models.lecturer import Lecturer
 from ui.common import ConsoleIO, Table, DASH
+from services.analytics import AttendanceAnalytics
 from services.attendance_service import AttendanceService
+from services.batch_export import batch_export, lecturer_classes
+from services.report_service import ReportService
 
 
 @dataclass
@@ -27,6 +32,9 @@ class LecturerUI:
             print("3. Approve/Reject Absence/Late Requests")
             print("4. Summarize Attendance")
             print("5. Export Attendance Report (Excel)")
+            print("6. Import Class Roster")
+            print("7. Batch Export (all my classes)")
+            print("8. At-risk Students")
             print("0. Logout")
             print(DASH)
             choice = ConsoleIO.ask("Selection: ")
@@ -41,6 +49,12 @@ class LecturerUI:
                 self.summarize(service)
             elif choice == "5":
                 self.export_report(service)
+            elif choice == "6":
+                self.import_roster(service)
+            elif choice == "7":
+                self.batch_export()
+            elif choice == "8":
+                self.at_risk()
             elif choice == "0":
                 return
             else:
@@ -105,6 +119,7 @@ class LecturerUI:
             print("1. Update a student status")
             print("2. Mark all as Present (batch)")
             print("3. Close session")
+            print("4. Apply status sheet (CSV: StudentID,Status,Note)")
             print("0. Back")
             choice = ConsoleIO.ask("Selection: ")
 
@@ -129,13 +144,28 @@ class LecturerUI:
                 print(msg)
             elif choice == "2":
                 if ConsoleIO.confirm("Confirm (Y/N): "):
-                    service.mark_all_present(session_id)
-                    print("Batch update done.")
+                    ok, msg = service.mark_all_present(session_id)
+                    print(msg)
             elif choice == "3":
                 if ConsoleIO.confirm("Confirm (Y/N): "):
                     ok = service.close_session(session_id, self.lecturer.user_id)
                     print("Closed." if ok else "Failed to close session.")
                     return
+            elif choice == "4":
+                path = ConsoleIO.ask("Enter sheet file path: ")
+                try:
+                    with open(path, encoding="utf-8", newline="") as f:
+                        entries = [
+                            (row[0], row[1], row[2] if len(row) > 2 else None)
+                            for row in csv.reader(f)
+                            if len(row) >= 2
+                        ]
+                except OSError as e:
+                    print(f"Cannot read file: {e}")
+                    continue
+                if ConsoleIO.confirm(f"Apply {len(entries)} row(s)? (Y/N): "):
+                    ok, msg = service.apply_status_sheet(session_id, entries)
+                    print(msg)
             elif choice == "0":
                 return
             else:
@@ -197,17 +227,94 @@ class LecturerUI:
             rows.append([r["StudentID"], str(r["Present"]), str(r["Late"]), str(r["Absent"]), r["AttendanceRate"]])
         Table(headers=["StudentID", "Present", "Late", "Absent", "Attendance Rate"], rows=rows).render()
 
+    def at_risk(self) -> None:
+        ConsoleIO.screen("AT-RISK STUDENTS")
+        class_name = ConsoleIO.ask("Enter Course/Class ID: ")
+        try:
+            students = AttendanceAnalytics.for_db(self.db).at_risk(class_name)
+        except RuntimeError as e:
+            print(e)
+            return
+        print(DASH)
+        if not students:
+            print("(No at-risk students.)")
+            return
+        rows = []
+        for s in students:
+            rows.append([s["StudentID"], f"{s['Rate']:.0%}", str(s["Absent"]), str(s["CurrentAbsenceStreak"]), "; ".join(s["Reasons"])])
+        Table(headers=["StudentID", "Rate", "Absent", "Absent Streak", "Reasons"], rows=rows).render()
+
     def export_report(self, service: AttendanceService) -> None:
         ConsoleIO.screen("EXPORT REPORT")
         class_name = ConsoleIO.ask("Enter Course/Class ID: ")
         dr = ConsoleIO.ask_date_range()
         out_path = ConsoleIO.ask("Enter output file path (e.g., reports/CSE101_Attendance.xlsx): ")
+        include_sessions = ConsoleIO.confirm("Include per-session detail sheet? (Y/N): ")
+        incremental = os.path.isfile(out_path) and ConsoleIO.confirm(
+            "File exists. Update it with changes only? (Y/N): "
+        )
         if not ConsoleIO.confirm("Confirm export (Y/N): "):
             return
-        ok, msg = service.export_report_xlsx(
-            class_name=class_name, date_from=dr.start, date_to=dr.end, output_path=out_path
+        reports = ReportService(self.db)
+        ok, msg = reports.get_or_export(
+            class_name=class_name,
+            date_from=dr.start,
+            date_to=dr.end,
+            output_path=out_path,
+            include_sessions=include_sessions,
+            lecturer_user_id=self.lecturer.user_id,
+            incremental=incremental,
         )
         print(DASH)
         print(msg)
         if ok:
             print(f"Output: {out_path}")
+            st = reports.last_export_stats
+            if st is not None:
+                kind = "changed" if st.incremental else "written"
+                print(f"Rows {kind}: {st.summary_rows} summary, {st.detail_rows} detail in {st.seconds:.2f}s")
+
+    def batch_export(self) -> None:
+        ConsoleIO.screen("BATCH EXPORT")
+        classes = lecturer_classes(self.db, self.lecturer.user_id)
+        if not classes:
+            print("(No classes found.)")
+            return
+        print(f"Classes: {', '.join(classes)}")
+        dr = ConsoleIO.ask_date_range()
+        out_dir = ConsoleIO.ask("Output folder (e.g., reports): ")
+        single = ConsoleIO.confirm("One workbook with a sheet per class? (Y/N): ")
+        if not ConsoleIO.confirm("Confirm export (Y/N): "):
+            return
+        result = batch_export(
+            self.db.db_path,
+            classes,
+            date_from=dr.start,
+            date_to=dr.end,
+            output_dir=out_dir,
+            single_workbook="Attendance_Reports.xlsx" if single else None,
+            progress=lambda done, total, c, ok: print(f"[{done}/{total}] {c}: {'ok' if ok else 'FAILED'}"),
+        )
+        print(DASH)
+        print(f"Exported {len(result.exported)}, failed {len(result.failed)} in {result.seconds:.1f}s.")
+        print(f"Manifest: {result.manifest_path}")
+
+    def import_roster(self, service: AttendanceService) -> None:
+        ConsoleIO.screen("IMPORT ROSTER")
+        class_name = ConsoleIO.ask("Enter Course/Class ID: ")
+        source = ConsoleIO.ask("StudentIDs (comma-separated) or roster file path (one ID per line): ")
+        if os.path.isfile(source):
+            try:
+                with open(source, encoding="utf-8") as f:
+                    student_ids = [line.split(",")[0].strip() for line in f]
+            except OSError as e:
+                print(f"Cannot read file: {e}")
+                return
+        else:
+            student_ids = source.split(",")
+        replace = ConsoleIO.confirm("Replace the existing roster? (Y/N): ")
+        if not ConsoleIO.confirm("Confirm import (Y/N): "):
+            return
+        ok, msg = service.import_roster(class_name=class_name, student_ids=student_ids, replace=replace)
+        print(DASH)
+        print(msg)